@@ -0,0 +1,40 @@
+-- Agregação das vendas para o dashboard (visualizacao.py).
+-- Devolve só os buckets já somados, em vez de todas as linhas de notas_detalhes.
+-- As regras de limpeza são as mesmas do cálculo local em src/agregacao.py:
+--   * 'resumo' considera todas as notas do período;
+--   * os gráficos ignoram forma de pagamento vazia ou 'Valor a Pagar' e
+--     exibem 'Valor a pagar R$:' como 'Não Especificado'.
+create or replace function agregar_vendas(data_inicio text, data_fim text, forma text default null)
+returns table (granularidade text, bucket text, total double precision, quantidade bigint, media double precision)
+language sql stable
+as $$
+    with base as (
+        select data_hora_venda, forma_pagamento, total_venda
+        from notas_detalhes
+        where data_hora_venda >= data_inicio::timestamp
+          and data_hora_venda <= data_fim::timestamp
+          and (forma is null or forma_pagamento = forma)
+    ),
+    graficos as (
+        select data_hora_venda,
+               total_venda,
+               case when forma_pagamento = 'Valor a pagar R$:' then 'Não Especificado'
+                    else forma_pagamento end as forma_pagamento
+        from base
+        where forma_pagamento is distinct from ''
+          and forma_pagamento is distinct from 'Valor a Pagar'
+    )
+    select 'resumo', 'total', coalesce(sum(total_venda), 0), count(*), coalesce(avg(total_venda), 0) from base
+    union all
+    select 'dia', to_char(data_hora_venda::date, 'YYYY-MM-DD'), sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'semana', extract(week from data_hora_venda)::int::text, sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'mes', extract(month from data_hora_venda)::int::text, sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'forma_pagamento', forma_pagamento, sum(total_venda), count(*), avg(total_venda)
+    from graficos where forma_pagamento is not null group by 2;
+$$;
@@ -0,0 +1,21 @@
+-- Substituição dos itens de um lote de notas (cache_paginas.py reparse --gravar).
+-- itens_nota não tem chave única, então regravar uma nota é apagar os itens antigos e
+-- inserir os novos. Aqui as duas coisas acontecem na mesma transação: se a inserção
+-- falhar, os itens antigos continuam lá.
+--   chaves: chaves de acesso do lote (inclusive as que ficaram sem itens)
+--   itens:  [{chave_acesso, produto, quantidade, preco_unitario, total_item}, ...]
+create or replace function substituir_itens_nota(chaves text[], itens jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    inseridos integer;
+begin
+    delete from itens_nota where chave_acesso = any(chaves);
+    insert into itens_nota (chave_acesso, produto, quantidade, preco_unitario, total_item)
+    select chave_acesso, produto, quantidade, preco_unitario, total_item
+    from jsonb_populate_recordset(null::itens_nota, itens);
+    get diagnostics inseridos = row_count;
+    return inseridos;
+end;
+$$;
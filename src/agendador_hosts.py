@@ -0,0 +1,213 @@
+"""
+Agendamento das consultas por portal da SEFAZ (um host por estado).
+
+Cada host tem:
+- um balde de tokens (consultas por segundo, com rajada), que cai pela metade quando o
+  portal responde 429/503 e volta a subir aos poucos com as respostas normais;
+- um limite de consultas simultâneas ajustado por AIMD: +1/limite a cada consulta rápida,
+  x0,5 a cada falha ou consulta mais lenta que 'latencia_alvo';
+- um disjuntor: após 'limiar_falhas' falhas seguidas (limitações 429/503 contam como
+  falha; um portal que só limita também precisa desistir) o host fica fechado por um tempo
+  (que dobra a cada reabertura) e depois libera uma única consulta de teste. Se o disjuntor
+  abrir 'max_aberturas' vezes sem nenhum sucesso, o host é suspenso até o fim da execução:
+  os jobs dele continuam pendentes na fila, sem gastar tentativas, para a próxima execução.
+
+O número de workers é fixo, então a capacidade que um portal degradado deixa de usar vai
+para os outros: a fila só entrega jobs de hosts que não estão bloqueados.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+from metricas import contar, observar
+
+# Estados do disjuntor
+FECHADO = "fechado"        # consultas normais
+ABERTO = "aberto"          # nenhuma consulta até 'aberto_ate'
+SEMIABERTO = "semiaberto"  # uma consulta de teste decide se fecha ou reabre
+SUSPENSO = "suspenso"      # desistido nesta execução
+
+def host_da_url(url):
+    """Host (em minúsculas) da URL; string vazia se não houver."""
+    return (urlsplit(url or "").hostname or "").lower()
+
+class BaldeTokens:
+    """Balde de tokens com taxa ajustável e pausa explícita (ex.: Retry-After)."""
+
+    __slots__ = ("taxa", "capacidade", "tokens", "instante", "pausado_ate")
+
+    def __init__(self, taxa, capacidade, agora):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self.instante = agora
+        self.pausado_ate = 0.0
+
+    def _repor(self, agora):
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.instante) * self.taxa)
+        self.instante = agora
+
+    def espera(self, agora):
+        """Segundos até haver um token disponível (0 se já houver)."""
+        if agora < self.pausado_ate:
+            return self.pausado_ate - agora
+        self._repor(agora)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.taxa
+
+    def consumir(self, agora):
+        self._repor(agora)
+        self.tokens -= 1
+
+class EstadoHost:
+    __slots__ = ("limite", "em_andamento", "balde", "circuito", "aberto_ate", "aberturas",
+                 "falhas_seguidas", "sucessos", "falhas", "limitacoes")
+
+    def __init__(self, limite, balde):
+        self.limite = float(limite)
+        self.em_andamento = 0
+        self.balde = balde
+        self.circuito = FECHADO
+        self.aberto_ate = 0.0
+        self.aberturas = 0
+        self.falhas_seguidas = 0
+        self.sucessos = 0
+        self.falhas = 0
+        self.limitacoes = 0
+
+# ============================================================
+# AGENDADOR
+# ============================================================
+class AgendadorHosts:
+    """
+    Decide quais hosts podem receber uma nova consulta agora.
+
+    Uso pela fila: bloqueados() antes de reservar um job, adquirir(host) para ocupar a vaga
+    e liberar(host, sucesso, duracao) quando a consulta terminar. Thread-safe.
+    """
+
+    def __init__(self, limite_inicial=2, limite_maximo=8, taxa=5.0, rajada=10, taxa_minima=0.1,
+                 latencia_alvo=10.0, limiar_falhas=5, espera_circuito=30.0, espera_circuito_maxima=600.0,
+                 max_aberturas=4):
+        self.limite_inicial = limite_inicial
+        self.limite_maximo = limite_maximo
+        self.taxa = taxa
+        self.rajada = rajada
+        self.taxa_minima = taxa_minima
+        self.latencia_alvo = latencia_alvo
+        self.limiar_falhas = limiar_falhas
+        self.espera_circuito = espera_circuito
+        self.espera_circuito_maxima = espera_circuito_maxima
+        self.max_aberturas = max_aberturas
+        self._hosts = {}
+        self._condicao = threading.Condition()
+
+    def _estado(self, host, agora):
+        estado = self._hosts.get(host)
+        if estado is None:
+            estado = self._hosts[host] = EstadoHost(self.limite_inicial, BaldeTokens(self.taxa, self.rajada, agora))
+        return estado
+
+    def _espera(self, estado, agora):
+        """Segundos até o host aceitar outra consulta; None se depender de uma consulta terminar."""
+        if estado.circuito == SUSPENSO:
+            return None
+        if estado.circuito == ABERTO:
+            if agora < estado.aberto_ate:
+                return estado.aberto_ate - agora
+            estado.circuito = SEMIABERTO
+        limite = 1 if estado.circuito == SEMIABERTO else int(estado.limite)
+        if estado.em_andamento >= limite:
+            return None
+        return estado.balde.espera(agora)
+
+    def bloqueados(self):
+        """Hosts conhecidos que não podem receber consulta neste instante."""
+        agora = time.monotonic()
+        with self._condicao:
+            return [host for host, estado in self._hosts.items() if self._espera(estado, agora) != 0]
+
+    def suspensos(self):
+        """Hosts desistidos nesta execução (os jobs deles podem ficar para a próxima)."""
+        with self._condicao:
+            return [host for host, estado in self._hosts.items() if estado.circuito == SUSPENSO]
+
+    def adquirir(self, host):
+        """Ocupa uma vaga do host (consumindo um token). Retorna False se ele estiver bloqueado."""
+        agora = time.monotonic()
+        with self._condicao:
+            estado = self._estado(host, agora)
+            if self._espera(estado, agora) != 0:
+                return False
+            estado.balde.consumir(agora)
+            estado.em_andamento += 1
+            return True
+
+    def liberar(self, host, sucesso, duracao, espera=None):
+        """
+        Devolve a vaga e ajusta o host. 'espera' indica que o portal pediu para reduzir o
+        ritmo (429/503, com o Retry-After se houver): o balde pausa e a taxa cai pela metade.
+        """
+        agora = time.monotonic()
+        with self._condicao:
+            estado = self._estado(host, agora)
+            estado.em_andamento = max(0, estado.em_andamento - 1)
+            observar("fiscalis_host_consulta_segundos", duracao, host=host)
+
+            if espera is not None:
+                estado.limitacoes += 1
+                estado.falhas_seguidas += 1
+                estado.balde.pausado_ate = max(estado.balde.pausado_ate, agora + espera)
+                estado.balde.taxa = max(self.taxa_minima, estado.balde.taxa / 2)
+                estado.limite = max(1.0, estado.limite / 2)
+                contar("fiscalis_host_limitacoes_total", host=host)
+                if estado.circuito == SEMIABERTO or estado.falhas_seguidas >= self.limiar_falhas:
+                    self._abrir(host, estado, agora)
+            elif sucesso:
+                estado.sucessos += 1
+                estado.falhas_seguidas = 0
+                if estado.circuito == SEMIABERTO:
+                    estado.circuito = FECHADO
+                    estado.aberturas = 0
+                if duracao > self.latencia_alvo:
+                    estado.limite = max(1.0, estado.limite / 2)
+                else:
+                    estado.limite = min(self.limite_maximo, estado.limite + 1 / estado.limite)
+                    estado.balde.taxa = min(self.taxa, estado.balde.taxa + self.taxa / 20)
+            else:
+                estado.falhas += 1
+                estado.falhas_seguidas += 1
+                estado.limite = max(1.0, estado.limite / 2)
+                if estado.circuito == SEMIABERTO or estado.falhas_seguidas >= self.limiar_falhas:
+                    self._abrir(host, estado, agora)
+            self._condicao.notify_all()
+
+    def _abrir(self, host, estado, agora):
+        estado.aberturas += 1
+        if estado.aberturas >= self.max_aberturas:
+            estado.circuito = SUSPENSO
+            contar("fiscalis_host_suspensoes_total", host=host)
+            return
+        espera = min(self.espera_circuito_maxima, self.espera_circuito * 2 ** (estado.aberturas - 1))
+        estado.circuito = ABERTO
+        estado.aberto_ate = agora + espera
+        estado.falhas_seguidas = 0
+        contar("fiscalis_host_circuitos_abertos_total", host=host)
+
+    def aguardar(self, timeout):
+        """Dorme até uma consulta terminar ou até 'timeout' segundos (o que vier antes)."""
+        agora = time.monotonic()
+        with self._condicao:
+            esperas = [self._espera(estado, agora) for estado in self._hosts.values()]
+            proxima = min((e for e in esperas if e), default=timeout)
+            self._condicao.wait(max(0.01, min(timeout, proxima)))
+
+    def resumo(self):
+        """{host: {...}} com limite, taxa, estado do disjuntor e contadores de cada host."""
+        with self._condicao:
+            return {host: {
+                "limite": round(estado.limite, 2),
+                "taxa": round(estado.balde.taxa, 2),
+                "circuito": estado.circuito,
+                "sucessos": estado.sucessos,
+                "falhas": estado.falhas,
+                "limitacoes": estado.limitacoes,
+            } for host, estado in self._hosts.items()}
@@ -0,0 +1,140 @@
+import logging
+import pandas as pd
+
+# Séries usadas pelos gráficos do dashboard
+GRANULARIDADES = ("dia", "semana", "mes", "forma_pagamento")
+COLUNAS = ["total", "quantidade", "media"]
+
+# ============================================================
+# CAMINHO LOCAL (pandas sobre as linhas de notas_detalhes)
+# ============================================================
+def obter_linhas_vendas(cliente, data_inicio, data_fim, forma_pagamento):
+    """Busca as linhas de 'notas_detalhes' do período (caminho antigo do dashboard)."""
+    query = cliente.table("notas_detalhes").select("*").gte("data_hora_venda", data_inicio).lte("data_hora_venda", data_fim)
+
+    if forma_pagamento != "Todas":
+        query = query.eq("forma_pagamento", forma_pagamento)
+
+    return query.execute().data
+
+def _resumir(grupos):
+    return pd.DataFrame({"total": grupos.sum(), "quantidade": grupos.count(), "media": grupos.mean()})
+
+def agregar_localmente(linhas):
+    """Calcula em pandas as mesmas séries que a função 'agregar_vendas' do banco devolve."""
+    df = pd.DataFrame(linhas, columns=["data_hora_venda", "forma_pagamento", "total_venda"])
+    total = float(df["total_venda"].sum())
+    quantidade = len(df)
+    series = {"resumo": {"total": total, "quantidade": quantidade,
+                         "media": total / quantidade if quantidade > 0 else 0}}
+
+    # Filtrando os dados: remover linha onde 'forma_pagamento' está vazio ou igual a 'Valor a Pagar'
+    df = df[(df['forma_pagamento'] != '') & (df['forma_pagamento'] != 'Valor a Pagar')].copy()
+
+    # Substituindo 'Valor a Pagar' por 'Não Especificado'
+    df['forma_pagamento'] = df['forma_pagamento'].replace('Valor a pagar R$:', 'Não Especificado')
+
+    data = pd.to_datetime(df['data_hora_venda'])
+    valores = df['total_venda']
+    series["dia"] = _resumir(valores.groupby(data.dt.date))
+    series["semana"] = _resumir(valores.groupby(data.dt.isocalendar().week.astype(int)))
+    series["mes"] = _resumir(valores.groupby(data.dt.month))
+    series["forma_pagamento"] = _resumir(valores.groupby(df['forma_pagamento']))
+    return series
+
+# ============================================================
+# CAMINHO NO BANCO (função 'agregar_vendas', ver sql/agregar_vendas.sql)
+# ============================================================
+def _converter_bucket(granularidade, bucket):
+    if granularidade == "dia":
+        return pd.Timestamp(bucket).date()
+    if granularidade in ("semana", "mes"):
+        return int(bucket)
+    return bucket
+
+def agregar_no_servidor(cliente, data_inicio, data_fim, forma_pagamento):
+    """Pede ao banco só os buckets agregados: o volume trafegado depende do número de buckets."""
+    parametros = {
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "forma": None if forma_pagamento == "Todas" else forma_pagamento,
+    }
+    return _montar_series(cliente.rpc("agregar_vendas", parametros).execute().data)
+
+def _montar_series(linhas):
+    """Converte as linhas (granularidade, bucket, total, quantidade, media) no dicionário de séries."""
+    series = {"resumo": {"total": 0.0, "quantidade": 0, "media": 0.0}}
+    por_granularidade = {g: [] for g in GRANULARIDADES}
+    for linha in linhas:
+        if linha["granularidade"] == "resumo":
+            series["resumo"] = {"total": float(linha["total"] or 0), "quantidade": int(linha["quantidade"]),
+                                "media": float(linha["media"] or 0)}
+        else:
+            por_granularidade[linha["granularidade"]].append(linha)
+
+    for granularidade, itens in por_granularidade.items():
+        df = pd.DataFrame(itens, columns=["bucket"] + COLUNAS)
+        df.index = [_converter_bucket(granularidade, b) for b in df.pop("bucket")]
+        series[granularidade] = df.sort_index()
+    return series
+
+# ============================================================
+# CAMINHO NO ESPELHO LOCAL (DuckDB sobre os Parquet de espelho_local.py)
+# ============================================================
+SQL_ESPELHO = """
+    with base as (
+        select data_hora_venda, forma_pagamento, total_venda
+        from notas_detalhes
+        where data_hora_venda >= $inicio::timestamp
+          and data_hora_venda <= $fim::timestamp
+          and ($forma is null or forma_pagamento = $forma)
+    ),
+    graficos as (
+        select data_hora_venda, total_venda,
+               case when forma_pagamento = 'Valor a pagar R$:' then 'Não Especificado'
+                    else forma_pagamento end as forma_pagamento
+        from base
+        where forma_pagamento is distinct from ''
+          and forma_pagamento is distinct from 'Valor a Pagar'
+    )
+    select 'resumo' as granularidade, 'total' as bucket, coalesce(sum(total_venda), 0) as total,
+           count(*) as quantidade, coalesce(avg(total_venda), 0) as media from base
+    union all
+    select 'dia', strftime(data_hora_venda, '%Y-%m-%d'), sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'semana', cast(week(data_hora_venda) as varchar), sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'mes', cast(month(data_hora_venda) as varchar), sum(total_venda), count(*), avg(total_venda)
+    from graficos group by 2
+    union all
+    select 'forma_pagamento', forma_pagamento, sum(total_venda), count(*), avg(total_venda)
+    from graficos where forma_pagamento is not null group by 2
+"""
+
+def agregar_no_espelho(conexao, data_inicio, data_fim, forma_pagamento):
+    """Mesma agregação do banco, executada localmente no espelho colunar (sem rede)."""
+    parametros = {
+        "inicio": data_inicio,
+        "fim": data_fim,
+        "forma": None if forma_pagamento == "Todas" else forma_pagamento,
+    }
+    linhas = conexao.execute(SQL_ESPELHO, parametros).df().to_dict("records")
+    return _montar_series(linhas)
+
+# ============================================================
+# PONTO DE ENTRADA
+# ============================================================
+def agregar_vendas(cliente, data_inicio, data_fim, forma_pagamento):
+    """
+    Retorna {"resumo": {...}, "dia"/"semana"/"mes"/"forma_pagamento": DataFrame[total, quantidade, media]}.
+    Usa a agregação no banco; se o cliente não tiver RPC (ex.: supabase_falso) ou a função
+    ainda não estiver instalada, cai para o cálculo local em pandas.
+    """
+    if hasattr(cliente, "rpc"):
+        try:
+            return agregar_no_servidor(cliente, data_inicio, data_fim, forma_pagamento)
+        except Exception as e:
+            logging.warning(f"Agregação no banco indisponível ({e}). Calculando localmente.")
+    return agregar_localmente(obter_linhas_vendas(cliente, data_inicio, data_fim, forma_pagamento))
@@ -0,0 +1,151 @@
+"""
+Análises por produto sobre 'itens_nota', com kernels vetorizados em NumPy.
+
+Os nomes de produto são normalizados e convertidos uma única vez em ids inteiros
+(preparar_itens); todas as agregações trabalham sobre esses arrays compactos.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+_ESPACOS = re.compile(r"\s+")
+
+# ============================================================
+# NORMALIZAÇÃO E INTERNAÇÃO DOS NOMES
+# ============================================================
+def normalizar_nome(nome):
+    """Maiúsculas, sem acentos e com espaços simples: 'Pão  Francês ' -> 'PAO FRANCES'."""
+    if not isinstance(nome, str):
+        return ""
+    sem_acento = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    return _ESPACOS.sub(" ", sem_acento).strip().upper()
+
+@dataclass
+class ItensIndexados:
+    """Itens em colunas NumPy; 'produto_id' indexa 'nomes' e 'nota_id' identifica a nota."""
+    nomes: np.ndarray
+    produto_id: np.ndarray
+    nota_id: np.ndarray
+    mes: np.ndarray  # datetime64[M]
+    quantidade: np.ndarray
+    preco_unitario: np.ndarray
+    total_item: np.ndarray
+
+    def __len__(self):
+        return len(self.produto_id)
+
+def preparar_itens(df):
+    """
+    Converte um DataFrame de itens (chave_acesso, data_hora_venda, produto, quantidade,
+    preco_unitario, total_item) em ItensIndexados. A normalização roda uma vez por nome
+    distinto, não por linha. Linhas sem nome de produto (nulo ou só espaços) são descartadas.
+    """
+    codigos_brutos, nomes_brutos = pd.factorize(df["produto"].astype(object), use_na_sentinel=False)
+    normalizados = np.array([normalizar_nome(n) or None for n in nomes_brutos], dtype=object)
+    ids_normalizados, nomes = pd.factorize(normalizados)  # sem nome -> -1
+    produto_id = ids_normalizados[codigos_brutos].astype(np.int32)
+    com_nome = produto_id >= 0
+    if not com_nome.all():
+        df = df[com_nome]
+        produto_id = produto_id[com_nome]
+
+    nota_id, _ = pd.factorize(df["chave_acesso"])
+    mes = pd.to_datetime(df["data_hora_venda"]).to_numpy().astype("datetime64[M]")
+
+    return ItensIndexados(
+        nomes=np.asarray(nomes, dtype=object),
+        produto_id=produto_id,
+        nota_id=nota_id.astype(np.int32),
+        mes=mes,
+        quantidade=df["quantidade"].to_numpy(dtype=np.float64, na_value=np.nan),
+        preco_unitario=df["preco_unitario"].to_numpy(dtype=np.float64, na_value=np.nan),
+        total_item=df["total_item"].to_numpy(dtype=np.float64, na_value=np.nan),
+    )
+
+def carregar_itens_espelho(diretorio="espelho"):
+    """Lê os itens do espelho local (espelho_local.py) já prontos para as análises."""
+    from espelho_local import conectar
+    conexao = conectar(diretorio)
+    df = conexao.sql(
+        "select chave_acesso, data_hora_venda, produto, quantidade, preco_unitario, total_item from itens_nota"
+    ).df()
+    return preparar_itens(df)
+
+# ============================================================
+# KERNELS
+# ============================================================
+def _somar_por(ids, valores, tamanho):
+    valido = ~np.isnan(valores)
+    return np.bincount(ids[valido], weights=valores[valido], minlength=tamanho)
+
+def top_produtos_por_gasto(itens, n=10):
+    """Os N produtos com maior gasto total."""
+    total_produtos = len(itens.nomes)
+    gasto = _somar_por(itens.produto_id, itens.total_item, total_produtos)
+    quantidade = _somar_por(itens.produto_id, itens.quantidade, total_produtos)
+    n = min(n, total_produtos)
+    if n == 0:
+        return pd.DataFrame(columns=["produto", "gasto", "quantidade"])
+    melhores = np.argpartition(-gasto, n - 1)[:n]
+    melhores = melhores[np.argsort(-gasto[melhores])]
+    return pd.DataFrame({"produto": itens.nomes[melhores], "gasto": gasto[melhores],
+                         "quantidade": quantidade[melhores]})
+
+def _grade_precos(itens):
+    """Preço unitário médio em uma grade [produto, mês]; NaN onde o produto não foi comprado."""
+    meses, mes_id = np.unique(itens.mes, return_inverse=True)
+    total_produtos, total_meses = len(itens.nomes), len(meses)
+    valido = ~np.isnan(itens.preco_unitario)
+    celula = itens.produto_id[valido].astype(np.int64) * total_meses + mes_id[valido]
+    soma = np.bincount(celula, weights=itens.preco_unitario[valido], minlength=total_produtos * total_meses)
+    contagem = np.bincount(celula, minlength=total_produtos * total_meses)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = (soma / contagem).reshape(total_produtos, total_meses)
+    return meses, media
+
+def serie_precos(itens, produto):
+    """Preço unitário médio, mínimo e máximo por mês de um produto (nome livre, é normalizado)."""
+    alvo = np.flatnonzero(itens.nomes == normalizar_nome(produto))
+    if not len(alvo):
+        return pd.DataFrame(columns=["medio", "minimo", "maximo"])
+    selecao = (itens.produto_id == alvo[0]) & ~np.isnan(itens.preco_unitario)
+    df = pd.DataFrame({"mes": itens.mes[selecao], "preco": itens.preco_unitario[selecao]})
+    serie = df.groupby("mes")["preco"].agg(medio="mean", minimo="min", maximo="max")
+    serie.index = pd.PeriodIndex(serie.index, freq="M")
+    return serie
+
+def distribuicao_tamanho_cesta(itens):
+    """Quantas notas têm 1, 2, 3... itens."""
+    itens_por_nota = np.bincount(itens.nota_id)
+    itens_por_nota = itens_por_nota[itens_por_nota > 0]
+    distribuicao = np.bincount(itens_por_nota)
+    tamanhos = np.flatnonzero(distribuicao)
+    return pd.Series(distribuicao[tamanhos], index=pd.Index(tamanhos, name="itens"), name="notas")
+
+def indice_inflacao(itens, mes_base=None):
+    """
+    Índice de preços de Laspeyres (base 100) com a cesta fixa do mês base: cada produto pesa
+    o quanto foi gasto nele no mês base, e só entram produtos com preço no mês base e no mês t.
+    'mes_base' ('AAAA-MM', padrão: o primeiro mês) precisa ter itens; senão, ValueError.
+    """
+    meses, precos = _grade_precos(itens)
+    if not len(meses):
+        return pd.Series(dtype=float, name="indice")
+    base = 0 if mes_base is None else int(np.searchsorted(meses, np.datetime64(mes_base, "M")))
+    if base >= len(meses) or (mes_base is not None and meses[base] != np.datetime64(mes_base, "M")):
+        raise ValueError(f"Mês base {mes_base} sem itens (meses disponíveis: {meses[0]} a {meses[-1]}).")
+
+    _, mes_id = np.unique(itens.mes, return_inverse=True)
+    no_base = (mes_id == base) & ~np.isnan(itens.total_item)
+    pesos = np.bincount(itens.produto_id[no_base], weights=itens.total_item[no_base], minlength=len(itens.nomes))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relativos = precos / precos[:, [base]]
+    presentes = ~np.isnan(relativos) & (pesos[:, None] > 0)
+    numerador = np.where(presentes, relativos * pesos[:, None], 0).sum(axis=0)
+    denominador = np.where(presentes, pesos[:, None], 0).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        indice = 100 * numerador / denominador
+    return pd.Series(indice, index=pd.PeriodIndex(meses, freq="M"), name="indice")
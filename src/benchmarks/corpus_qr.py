@@ -0,0 +1,85 @@
+"""
+Gera um corpus reprodutível de fotos de QR Code de NFC-e para os benchmarks.
+
+Uso (a partir de src/):
+    python -m benchmarks.corpus_qr pasta_destino [--quantidade 200] [--url-base http://127.0.0.1:8765]
+
+Cada imagem traz a URL de consulta de uma nota sintética (ver simulador_sefaz.url_sintetica)
+com chave de acesso válida, em tamanho, rotação, ruído, desfoque e compressão variados.
+O gabarito fica em 'corpus.jsonl' ({"arquivo", "chave_acesso", "texto"} por linha).
+"""
+import argparse
+import json
+import os
+import random
+import cv2
+import numpy as np
+from extracao_qr import digito_verificador
+from simulador_sefaz import url_sintetica
+
+def gerar_chave(aleatorio):
+    """Chave de acesso de 44 dígitos com dígito verificador correto (modelo 65, NFC-e)."""
+    chave43 = (f"{aleatorio.choice([11, 23, 31, 35, 41, 43, 53])}"     # UF
+               f"24{aleatorio.randint(1, 12):02d}"                       # AAMM
+               f"{aleatorio.randrange(10 ** 14):014d}65"                 # CNPJ + modelo
+               f"{aleatorio.randrange(1000):03d}{aleatorio.randrange(10 ** 9):09d}1"
+               f"{aleatorio.randrange(10 ** 8):08d}")
+    return chave43 + str(digito_verificador(chave43))
+
+def desenhar_qr(texto, aleatorio):
+    """Foto sintética: QR sobre fundo com ruído, com escala, rotação, desfoque e brilho aleatórios."""
+    modulos = cv2.QRCodeEncoder.create().encode(texto)
+    lado = int(modulos.shape[0] * aleatorio.uniform(3, 8))
+    qr = cv2.resize(modulos, (lado, lado), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+
+    tamanho = int(qr.shape[0] * aleatorio.uniform(1.3, 2.0))
+    gerador = np.random.default_rng(aleatorio.randrange(2 ** 32))
+    fundo = gerador.normal(aleatorio.uniform(120, 200), 20, (tamanho, tamanho)).clip(0, 255).astype(np.uint8)
+    y = aleatorio.randrange(tamanho - qr.shape[0] + 1)
+    x = aleatorio.randrange(tamanho - qr.shape[1] + 1)
+    fundo[y:y + qr.shape[0], x:x + qr.shape[1]] = qr
+
+    rotacao = cv2.getRotationMatrix2D((tamanho / 2, tamanho / 2), aleatorio.uniform(-25, 25), 1.0)
+    imagem = cv2.warpAffine(fundo, rotacao, (tamanho, tamanho), borderValue=int(fundo.mean()))
+    if aleatorio.random() < 0.5:
+        imagem = cv2.GaussianBlur(imagem, (0, 0), aleatorio.uniform(0.5, 1.5))
+    imagem = cv2.convertScaleAbs(imagem, alpha=aleatorio.uniform(0.7, 1.1), beta=aleatorio.uniform(-20, 20))
+    return cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR)
+
+def gerar_corpus(diretorio, quantidade=200, url_base="http://127.0.0.1:8765", semente=42):
+    """Grava as imagens e o gabarito em 'diretorio'. Retorna a lista de registros do gabarito."""
+    os.makedirs(diretorio, exist_ok=True)
+    aleatorio = random.Random(semente)
+    registros = []
+    for indice in range(quantidade):
+        chave = gerar_chave(aleatorio)
+        texto = url_sintetica(url_base, chave)
+        imagem = desenhar_qr(texto, aleatorio)
+        nome = f"qr_{indice:05d}.jpg"
+        qualidade = aleatorio.randint(60, 95)
+        cv2.imwrite(os.path.join(diretorio, nome), imagem, [cv2.IMWRITE_JPEG_QUALITY, qualidade])
+        registros.append({"arquivo": nome, "chave_acesso": chave, "texto": texto})
+
+    with open(os.path.join(diretorio, "corpus.jsonl"), "w", encoding="utf-8") as saida:
+        for registro in registros:
+            saida.write(json.dumps(registro) + "\n")
+    return registros
+
+def carregar_gabarito(diretorio):
+    with open(os.path.join(diretorio, "corpus.jsonl"), encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um corpus de imagens de QR Code de NFC-e.")
+    parser.add_argument("diretorio")
+    parser.add_argument("--quantidade", type=int, default=200)
+    parser.add_argument("--url-base", default="http://127.0.0.1:8765")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    registros = gerar_corpus(args.diretorio, args.quantidade, args.url_base, args.semente)
+    print(f"{len(registros)} imagens gravadas em {args.diretorio}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark da decodificação em lote: imagens/s em função do número de workers.
+
+Uso (a partir de src/):
+    python -m benchmarks.lote_qr pasta_de_fotos [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+from lote_qr import listar_imagens, processar_diretorio
+
+def medir(caminhos, workers):
+    inicio = time.perf_counter()
+    com_chave = sum(1 for registro in processar_diretorio(caminhos, workers) if registro["chaves"])
+    duracao = time.perf_counter() - inicio
+    return len(caminhos) / duracao, com_chave
+
+def main():
+    cpus = os.cpu_count() or 1
+    padrao = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    parser = argparse.ArgumentParser(description="Escalabilidade da decodificação em lote de QR Codes.")
+    parser.add_argument("diretorio")
+    parser.add_argument("--workers", type=int, nargs="+", default=padrao)
+    args = parser.parse_args()
+
+    caminhos = listar_imagens(args.diretorio)
+    if not caminhos:
+        print("Nenhuma imagem encontrada.")
+        return
+
+    base = None
+    for workers in args.workers:
+        taxa, com_chave = medir(caminhos, workers)
+        base = base or taxa
+        print(f"{workers:>3} workers: {taxa:8.1f} imagens/s ({taxa / base:.2f}x), {com_chave}/{len(caminhos)} com chave")
+
+if __name__ == "__main__":
+    main()
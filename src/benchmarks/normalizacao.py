@@ -0,0 +1,82 @@
+"""
+Microbenchmark da normalização dos campos raspados: linhas (itens) por segundo.
+
+Uso (a partir de src/):
+    python -m benchmarks.normalizacao [--notas 20000] [--itens 8]
+
+Compara a conversão antiga (replace + float + strptime por campo, alterando 'dados')
+com normalizar_lote. Serve para confirmar que as conversões extras (milhares, rejeições)
+não custam mais que o caminho antigo; não se espera ganho.
+"""
+import argparse
+import copy
+import random
+import time
+from datetime import datetime
+from normalizacao import normalizar_lote
+
+def gerar_notas(quantidade, itens_por_nota, semente=42):
+    aleatorio = random.Random(semente)
+    notas = []
+    for indice in range(quantidade):
+        produtos = []
+        for _ in range(itens_por_nota):
+            qtde = aleatorio.choice([1, 2, 3, 1.235, 0.5])
+            preco = round(aleatorio.uniform(0.5, 90), 2)
+            produtos.append({
+                "produto": f"PRODUTO {aleatorio.randrange(500)}",
+                "quantidade": "Qtde.:" + str(qtde).replace(".", ","),
+                "preco_unitario": "Vl. Unit.: " + f"{preco:.2f}".replace(".", ","),
+                "valor_total": f"{qtde * preco:.2f}".replace(".", ","),
+            })
+        dados = {
+            "url": f"https://exemplo/{indice}",
+            "produtos": produtos,
+            "data_hora_venda": f"{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/2024 "
+                               f"{aleatorio.randint(0, 23):02d}:{aleatorio.randint(0, 59):02d}:00",
+            "total_venda": "123,45",
+            "forma_pagamento": "Dinheiro",
+        }
+        notas.append((dados, f"{indice:044d}"))
+    return notas
+
+def normalizar_antigo(dados, chave_acesso):
+    """'montar_registros' como era antes de normalizacao.py: conversão campo a campo, alterando 'dados'."""
+    dados["total_venda"] = float(dados["total_venda"].replace(",", ".")) if dados["total_venda"] else None
+    if dados["data_hora_venda"]:
+        dados["data_hora_venda"] = datetime.strptime(dados["data_hora_venda"], "%d/%m/%Y %H:%M:%S").isoformat()
+    for produto in dados["produtos"]:
+        produto["quantidade"] = float(produto["quantidade"].replace("Qtde.:", "").replace(",", ".")) if produto["quantidade"] else None
+        produto["preco_unitario"] = float(produto["preco_unitario"].replace("Vl. Unit.:", "").replace(",", ".")) if produto["preco_unitario"] else None
+        produto["valor_total"] = float(produto["valor_total"].replace(",", ".").strip()) if produto["valor_total"] else None
+    detalhe = {"chave_acesso": chave_acesso, "data_hora_venda": dados["data_hora_venda"],
+               "forma_pagamento": dados["forma_pagamento"], "total_venda": dados["total_venda"]}
+    itens = [{"chave_acesso": chave_acesso, "produto": p["produto"], "quantidade": p["quantidade"],
+              "preco_unitario": p["preco_unitario"], "total_item": p["valor_total"]} for p in dados["produtos"]]
+    return detalhe, itens
+
+def medir(funcao, linhas):
+    inicio = time.perf_counter()
+    funcao()
+    return linhas / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Linhas por segundo da normalização dos campos raspados.")
+    parser.add_argument("--notas", type=int, default=20000)
+    parser.add_argument("--itens", type=int, default=8)
+    args = parser.parse_args()
+
+    notas = gerar_notas(args.notas, args.itens)
+    linhas = args.notas * args.itens
+    copias = copy.deepcopy(notas)  # o caminho antigo altera os dicionários
+
+    antigo = medir(lambda: [normalizar_antigo(dados, chave) for dados, chave in copias], linhas)
+    por_nota = medir(lambda: [normalizar_lote([nota]) for nota in notas], linhas)
+    em_lote = medir(lambda: normalizar_lote(notas), linhas)
+
+    print(f"Antigo (por campo):   {antigo:12,.0f} linhas/s")
+    print(f"normalizar_lote x1:   {por_nota:12,.0f} linhas/s ({por_nota / antigo:.2f}x)")
+    print(f"normalizar_lote lote: {em_lote:12,.0f} linhas/s ({em_lote / antigo:.2f}x)")
+
+if __name__ == "__main__":
+    main()
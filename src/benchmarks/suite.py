@@ -0,0 +1,320 @@
+"""
+Suíte de benchmarks de ponta a ponta, sem rede nem Supabase real.
+
+Uso (a partir de src/):
+    python -m benchmarks.suite [--notas 300] [--itens 8] [--latencia 0.02] [--imagens 100] [--linhas 100000]
+    python -m benchmarks.suite --comparar benchmarks/resultados/A.json benchmarks/resultados/B.json
+
+- fase1: fotos de QR geradas (corpus_qr) -> decodificação -> chave -> cache -> insert em notas_fiscais
+- fase2: ingestão imediata, URLs sintéticas -> PipelineIngestao (HTTP + lxml contra o simulador_sefaz) -> ClienteFalso
+- fase2_fila: o caminho do fase2.py, FilaJobs -> PoolDrivers -> AgendadorHosts -> processar_job
+  (consulta HTTP, CachePaginas, detecção de anomalias) -> GravadorLote -> ClienteFalso
+- dashboard: agregação de 'notas_detalhes' em pandas (via ClienteFalso) e no espelho DuckDB
+
+Cada execução grava um JSON em benchmarks/resultados/ com a versão (git) e os parâmetros.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from metricas import REGISTRO
+from supabase_falso import ClienteFalso
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+def resumir(latencias):
+    """Média, p50 e p95 (ms) de uma lista de durações em segundos."""
+    if not latencias:
+        return {"media_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+    ordenadas = sorted(latencias)
+    posicao = lambda q: ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))] * 1000
+    return {"media_ms": sum(ordenadas) / len(ordenadas) * 1000, "p50_ms": posicao(0.5), "p95_ms": posicao(0.95)}
+
+def medias_histogramas():
+    """Média (ms) de cada histograma do registro de métricas, por nome e rótulos."""
+    medias = {}
+    for histograma in REGISTRO.snapshot()["histogramas"]:
+        rotulos = ",".join(f"{k}={v}" for k, v in sorted(histograma["rotulos"].items()))
+        nome = histograma["nome"] + (f"[{rotulos}]" if rotulos else "")
+        medias[nome] = histograma["soma"] / histograma["contagem"] * 1000
+    return medias
+
+# ============================================================
+# FASE 1: QR -> notas_fiscais
+# ============================================================
+def medir_fase1(imagens, url_base):
+    from benchmarks.corpus_qr import gerar_corpus
+    from lote_qr import abrir_imagem, decodificar_imagem
+    from extracao_qr import extrair_dados, chave_valida
+    from cache_chaves import CacheChaves
+
+    cliente = ClienteFalso()
+    cache = CacheChaves()
+    estagios = {"abrir": [], "decodificar": [], "extrair": [], "gravar": []}
+    lidas = 0
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        gabarito = gerar_corpus(diretorio, imagens, url_base)
+        inicio = time.perf_counter()
+        for registro in gabarito:
+            t = time.perf_counter()
+            imagem = abrir_imagem(os.path.join(diretorio, registro["arquivo"]))
+            estagios["abrir"].append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            textos = decodificar_imagem(imagem)
+            estagios["decodificar"].append(time.perf_counter() - t)
+            if not textos:
+                continue
+
+            t = time.perf_counter()
+            dados = extrair_dados(textos[0])
+            estagios["extrair"].append(time.perf_counter() - t)
+            if not chave_valida(dados["chave_acesso"]) or cache.contem(dados["chave_acesso"]):
+                continue
+
+            t = time.perf_counter()
+            cliente.table("notas_fiscais").insert({
+                "url": dados["url_cupom"], "chave_acesso": dados["chave_acesso"],
+                "data_hora_leitura": datetime.now().isoformat(),
+            }).execute()
+            cache.adicionar(dados["chave_acesso"])
+            estagios["gravar"].append(time.perf_counter() - t)
+            lidas += dados["chave_acesso"] == registro["chave_acesso"]
+        duracao = time.perf_counter() - inicio
+
+    return {
+        "imagens": imagens,
+        "taxa_leitura": lidas / imagens if imagens else 0.0,
+        "imagens_por_segundo": imagens / duracao,
+        "estagios": {nome: resumir(valores) for nome, valores in estagios.items()},
+    }
+
+# ============================================================
+# FASE 2: URL -> consulta -> normalização -> notas_detalhes/itens_nota
+# ============================================================
+def medir_fase2(url_base, notas, itens, workers, latencia_banco):
+    from benchmarks.corpus_qr import gerar_chave
+    from pipeline import PipelineIngestao
+    from simulador_sefaz import url_sintetica
+
+    aleatorio = random.Random(7)
+    textos = [url_sintetica(url_base, gerar_chave(aleatorio), itens) for _ in range(notas)]
+    cliente = ClienteFalso(latencia=latencia_banco)
+    pipeline = PipelineIngestao(cliente, workers_consulta=workers)
+
+    REGISTRO.limpar()
+    inicio = time.perf_counter()
+    estatisticas = asyncio.run(pipeline.executar(textos))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "notas": notas,
+        "itens_por_nota": itens,
+        "workers_consulta": workers,
+        "gravadas": estatisticas.get("gravadas", 0),
+        "notas_por_segundo": estatisticas.get("gravadas", 0) / duracao,
+        "round_trips_banco": cliente.round_trips,
+        "latencias_medias_ms": medias_histogramas(),
+    }
+
+def medir_fase2_fila(url_base, notas, itens, workers, latencia_banco, taxa_host):
+    """
+    Roda o processar_job do fase2.py sobre fila.iterar(agendador=...), como o main() do fase2,
+    com fila, cache de páginas e anomalias em um diretório temporário. O balde de tokens por
+    host usa 'taxa_host' (o simulador é um único host local); o resto vem da configuração.
+    """
+    import fase2
+    from benchmarks.corpus_qr import gerar_chave
+    from simulador_sefaz import url_sintetica
+    from fila_jobs import FilaJobs
+    from pool_drivers import PoolDrivers
+    from agendador_hosts import AgendadorHosts
+    from gravacao_lote import GravadorLote
+    from cache_paginas import CachePaginas
+    from deteccao_anomalias import DetectorAnomalias, RegistroAnomalias
+
+    aleatorio = random.Random(7)
+    chaves = [gerar_chave(aleatorio) for _ in range(notas)]
+    pendentes = {chave: url_sintetica(url_base, chave, itens) for chave in chaves}
+    cliente = ClienteFalso(latencia=latencia_banco)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        fase2.EXIBIR_TABELAS = False
+        fase2.fila = FilaJobs(os.path.join(diretorio, "fila.db"), fase2.MAX_TENTATIVAS, fase2.ESPERA_BASE)
+        fase2.gravador = GravadorLote(cliente, fase2.TAMANHO_LOTE, fase2.INTERVALO_LOTE,
+                                      ao_gravar=fase2.concluir_jobs, ao_falhar=fase2.falhar_jobs)
+        fase2.detector = DetectorAnomalias()
+        fase2.registro_anomalias = RegistroAnomalias(os.path.join(diretorio, "anomalias.jsonl"))
+        fase2.agendador = AgendadorHosts(limite_maximo=workers, taxa=taxa_host, rajada=workers,
+                                         latencia_alvo=fase2.LATENCIA_ALVO, limiar_falhas=fase2.LIMIAR_CIRCUITO,
+                                         espera_circuito=fase2.ESPERA_CIRCUITO)
+        fase2.cache_paginas = CachePaginas(os.path.join(diretorio, "cache_paginas"))
+        try:
+            fase2.fila.enfileirar(pendentes)
+            REGISTRO.limpar()
+            inicio = time.perf_counter()
+            PoolDrivers(workers).processar(fase2.fila.iterar(agendador=fase2.agendador), fase2.processar_job)
+            fase2.gravador.fechar()
+            duracao = time.perf_counter() - inicio
+            contagem = fase2.fila.contagem()
+        finally:
+            fase2.registro_anomalias.fechar()
+            fase2.cache_paginas.fechar()
+            fase2.fila.fechar()
+            fase2.fila = fase2.gravador = fase2.detector = fase2.registro_anomalias = None
+            fase2.agendador = fase2.cache_paginas = None
+
+    gravadas = len(cliente.tabelas.get("notas_detalhes", []))
+    return {
+        "notas": notas,
+        "itens_por_nota": itens,
+        "workers": workers,
+        "taxa_host": taxa_host,
+        "tamanho_lote": fase2.TAMANHO_LOTE,
+        "gravadas": gravadas,
+        "concluidas": contagem.get("concluido", 0),
+        "notas_por_segundo": gravadas / duracao,
+        "round_trips_banco": cliente.round_trips,
+        "latencias_medias_ms": medias_histogramas(),
+    }
+
+# ============================================================
+# DASHBOARD: agregação de notas_detalhes
+# ============================================================
+def gerar_detalhes(linhas, semente=11):
+    aleatorio = random.Random(semente)
+    formas = ["Cartão de Crédito", "Cartão de Débito", "Dinheiro", "Vale Alimentação", "Valor a pagar R$:", ""]
+    inicio = datetime(2024, 1, 1)
+    return [{
+        "chave_acesso": f"{indice:044d}",
+        "data_hora_venda": (inicio + timedelta(minutes=aleatorio.randrange(60 * 24 * 365))).isoformat(),
+        "forma_pagamento": aleatorio.choice(formas),
+        "total_venda": round(aleatorio.uniform(2, 400), 2),
+    } for indice in range(linhas)]
+
+def medir_dashboard(linhas, repeticoes=3):
+    from agregacao import agregar_vendas, agregar_no_espelho
+    from espelho_local import gravar_particoes, conectar
+
+    detalhes = gerar_detalhes(linhas)
+    cliente = ClienteFalso({"notas_detalhes": detalhes})
+    parametros = ("2024-01-01", "2024-12-31", "Todas")
+
+    local = []
+    for _ in range(repeticoes):
+        t = time.perf_counter()
+        agregar_vendas(cliente, *parametros)
+        local.append(time.perf_counter() - t)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        gravar_particoes(diretorio, "notas_detalhes", detalhes, "bench")
+        conexao = conectar(diretorio)
+        espelho = []
+        for _ in range(repeticoes):
+            t = time.perf_counter()
+            agregar_no_espelho(conexao, *parametros)
+            espelho.append(time.perf_counter() - t)
+        conexao.close()
+
+    return {"linhas": linhas, "pandas_local": resumir(local), "espelho_duckdb": resumir(espelho)}
+
+# ============================================================
+# RESULTADOS
+# ============================================================
+def versao_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+def salvar_resultado(resultado, diretorio=DIRETORIO_RESULTADOS):
+    os.makedirs(diretorio, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['versao']}.json"
+    caminho = os.path.join(diretorio, nome)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    return caminho
+
+def _achatar(dados, prefixo=""):
+    for chave, valor in dados.items():
+        nome = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            yield from _achatar(valor, nome + ".")
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield nome, valor
+
+def comparar(caminho_a, caminho_b):
+    """Imprime as métricas numéricas dos dois resultados lado a lado, com a razão B/A."""
+    with open(caminho_a, encoding="utf-8") as a, open(caminho_b, encoding="utf-8") as b:
+        resultado_a, resultado_b = json.load(a), json.load(b)
+    metricas_a = dict(_achatar(resultado_a["resultados"]))
+    metricas_b = dict(_achatar(resultado_b["resultados"]))
+    print(f"{'métrica':<84} {resultado_a['versao']:>12} {resultado_b['versao']:>12}   B/A")
+    for nome in sorted(metricas_a.keys() | metricas_b.keys()):
+        valor_a, valor_b = metricas_a.get(nome), metricas_b.get(nome)
+        razao = f"{valor_b / valor_a:6.2f}" if valor_a and valor_b is not None else "     -"
+        formatar = lambda v: f"{v:12.3f}" if v is not None else f"{'-':>12}"
+        print(f"{nome:<84} {formatar(valor_a)} {formatar(valor_b)} {razao}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de ponta a ponta da fase 1, fase 2 e dashboard.")
+    parser.add_argument("--notas", type=int, default=300, help="notas consultadas na fase 2")
+    parser.add_argument("--itens", type=int, default=8, help="itens por nota sintética")
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência (s) de cada página do simulador")
+    parser.add_argument("--latencia-banco", type=float, default=0.005, help="latência (s) de cada chamada ao banco falso")
+    parser.add_argument("--workers", type=int, default=8, help="consultas simultâneas na fase 2")
+    parser.add_argument("--taxa-host", type=float, default=200.0,
+                        help="consultas/s por host na etapa fase2_fila (o simulador é um único host)")
+    parser.add_argument("--imagens", type=int, default=100, help="imagens de QR na fase 1")
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas de notas_detalhes no dashboard")
+    parser.add_argument("--etapas", nargs="+", default=["fase1", "fase2", "fase2_fila", "dashboard"],
+                        choices=["fase1", "fase2", "fase2_fila", "dashboard"])
+    parser.add_argument("--comparar", nargs=2, metavar=("A", "B"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    from simulador_sefaz import iniciar_simulador
+    servidor, url_base = iniciar_simulador(latencia=args.latencia, itens_padrao=args.itens)
+    resultados = {}
+    try:
+        if "fase1" in args.etapas:
+            resultados["fase1"] = medir_fase1(args.imagens, url_base)
+            print(f"fase1: {resultados['fase1']['imagens_por_segundo']:.1f} imagens/s, "
+                  f"leitura {resultados['fase1']['taxa_leitura']:.0%}")
+        if "fase2" in args.etapas:
+            resultados["fase2"] = medir_fase2(url_base, args.notas, args.itens, args.workers, args.latencia_banco)
+            print(f"fase2: {resultados['fase2']['notas_por_segundo']:.1f} notas/s, "
+                  f"{resultados['fase2']['round_trips_banco']} chamadas ao banco")
+        if "fase2_fila" in args.etapas:
+            resultados["fase2_fila"] = medir_fase2_fila(url_base, args.notas, args.itens, args.workers,
+                                                        args.latencia_banco, args.taxa_host)
+            print(f"fase2_fila: {resultados['fase2_fila']['notas_por_segundo']:.1f} notas/s, "
+                  f"{resultados['fase2_fila']['concluidas']} jobs concluídos, "
+                  f"{resultados['fase2_fila']['round_trips_banco']} chamadas ao banco")
+        if "dashboard" in args.etapas:
+            resultados["dashboard"] = medir_dashboard(args.linhas)
+            print(f"dashboard: pandas {resultados['dashboard']['pandas_local']['media_ms']:.1f} ms, "
+                  f"espelho {resultados['dashboard']['espelho_duckdb']['media_ms']:.1f} ms")
+    finally:
+        servidor.shutdown()
+
+    resultado = {
+        "versao": versao_codigo(),
+        "instante": datetime.now().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "resultados": resultados,
+    }
+    print(f"Resultado gravado em {salvar_resultado(resultado)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import threading
+from paginacao import paginar
+
+# ============================================================
+# CACHE LOCAL DAS CHAVES DE ACESSO CADASTRADAS
+# ============================================================
+class CacheChaves:
+    """
+    Conjunto em memória das chaves de 'notas_fiscais'. As chaves de 44 dígitos são guardadas
+    como inteiros, bem menores que as strings.
+    Um 'não' do cache só quer dizer "não visto por este processo": o banco ainda deve ser
+    consultado nesse caso, pois outro leitor pode ter gravado a chave.
+    """
+
+    def __init__(self):
+        self._chaves = set()
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def _compactar(chave):
+        return int(chave)
+
+    def aquecer(self, cliente, tamanho_pagina=1000):
+        """Carrega todas as chaves cadastradas com um select paginado. Retorna o total."""
+        for pagina in paginar(cliente, "notas_fiscais", "chave_acesso", tamanho_pagina=tamanho_pagina):
+            for item in pagina:
+                if item["chave_acesso"]:
+                    self.adicionar(item["chave_acesso"])
+        return len(self)
+
+    def adicionar(self, chave):
+        valor = self._compactar(chave)
+        with self._trava:
+            self._chaves.add(valor)
+
+    def contem(self, chave):
+        return self._compactar(chave) in self._chaves
+
+    def __len__(self):
+        return len(self._chaves)
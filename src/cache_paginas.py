@@ -0,0 +1,275 @@
+"""
+Cache local das páginas de NFC-e consultadas, para reextrair os dados sem raspar de novo.
+
+O HTML do iframe 'danfeNFCe' é gravado comprimido (zlib) em objetos endereçados pelo
+SHA-256 do conteúdo (páginas idênticas ocupam um único objeto). Um índice SQLite liga
+cada chave de acesso ao seu objeto e guarda o último acesso de cada objeto: quando o
+total passa de 'limite_bytes', os objetos usados há mais tempo são removidos (LRU).
+
+Uso (a partir de src/):
+    python cache_paginas.py reparse [--workers 8] [--saida dados.jsonl] [--gravar] [--chaves arquivo.txt]
+    python cache_paginas.py info
+
+'reparse' roda extrair_dados_html sobre todo o cache em paralelo (um processo por núcleo).
+Com --gravar, os dados reextraídos são regravados em 'notas_detalhes' (upsert) e 'itens_nota'
+(os itens antigos de cada nota são apagados antes de inserir os novos) pelo mesmo caminho de
+normalização da fase 2. As chaves regravadas vão para --chaves-gravadas, que serve de
+entrada para 'python espelho_local.py --chaves' (o espelho local não vê regravações sozinho).
+As chaves de lotes descartados vão para --chaves-nao-gravadas e o comando termina com código
+1; 'reparse --gravar --chaves' com esse arquivo refaz só essas notas.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from multiprocessing import Pool
+from metricas import contar
+
+DIRETORIO_PADRAO = "cache_paginas"
+LIMITE_PADRAO = 512 * 1024 * 1024
+
+# ============================================================
+# CACHE ENDEREÇADO POR CONTEÚDO
+# ============================================================
+class CachePaginas:
+    """
+    guardar(chave_acesso, url, html) grava a página; ler(chave_acesso) devolve (url, html).
+    'html' pode ser bytes (resposta HTTP, decodificada pelo lxml conforme o documento) ou
+    str (page_source do Selenium); o tipo original é preservado na leitura.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, limite_bytes=LIMITE_PADRAO, nivel_compressao=6):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self.nivel_compressao = nivel_compressao
+        os.makedirs(os.path.join(diretorio, "objetos"), exist_ok=True)
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(os.path.join(diretorio, "indice.db"), check_same_thread=False,
+                                        isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS objetos (
+                hash TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                chave_acesso TEXT PRIMARY KEY,
+                url TEXT,
+                hash TEXT NOT NULL,
+                texto INTEGER NOT NULL,
+                gravado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_objetos_acesso ON objetos (acessado_em)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_paginas_hash ON paginas (hash)")
+        self._bytes = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM objetos").fetchone()[0]
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
+
+    def caminho_objeto(self, hash_conteudo):
+        return os.path.join(self.diretorio, "objetos", hash_conteudo[:2], hash_conteudo[2:])
+
+    def guardar(self, chave_acesso, url, html):
+        """Grava (ou substitui) a página da nota. Retorna o hash do conteúdo."""
+        texto = isinstance(html, str)
+        conteudo = html.encode("utf-8") if texto else bytes(html)
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        caminho = self.caminho_objeto(hash_conteudo)
+        agora = time.time()
+
+        with self._trava:
+            existente = self._conexao.execute("SELECT 1 FROM objetos WHERE hash = ?", (hash_conteudo,)).fetchone()
+            if not existente:
+                comprimido = zlib.compress(conteudo, self.nivel_compressao)
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temporario, "wb") as arquivo:
+                    arquivo.write(comprimido)
+                os.replace(temporario, caminho)
+                self._conexao.execute("INSERT INTO objetos (hash, tamanho, acessado_em) VALUES (?, ?, ?)",
+                                      (hash_conteudo, len(comprimido), agora))
+                self._bytes += len(comprimido)
+            else:
+                self._conexao.execute("UPDATE objetos SET acessado_em = ? WHERE hash = ?", (agora, hash_conteudo))
+
+            anterior = self._conexao.execute("SELECT hash FROM paginas WHERE chave_acesso = ?", (chave_acesso,)).fetchone()
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO paginas (chave_acesso, url, hash, texto, gravado_em) VALUES (?, ?, ?, ?, ?)",
+                (chave_acesso, url, hash_conteudo, int(texto), agora)
+            )
+            if anterior and anterior[0] != hash_conteudo:
+                self._remover_se_orfao(anterior[0])
+            if not existente:
+                self._despejar()
+        return hash_conteudo
+
+    def ler(self, chave_acesso):
+        """(url, html) da nota, ou None se ela não estiver no cache."""
+        with self._trava:
+            linha = self._conexao.execute("SELECT url, hash, texto FROM paginas WHERE chave_acesso = ?",
+                                          (chave_acesso,)).fetchone()
+            if not linha:
+                return None
+            self._conexao.execute("UPDATE objetos SET acessado_em = ? WHERE hash = ?", (time.time(), linha[1]))
+        url, hash_conteudo, texto = linha
+        return url, ler_objeto(self.caminho_objeto(hash_conteudo), texto)
+
+    def listar(self):
+        """[(chave_acesso, url, caminho_do_objeto, texto)] de todas as páginas em cache."""
+        with self._trava:
+            linhas = self._conexao.execute("SELECT chave_acesso, url, hash, texto FROM paginas ORDER BY chave_acesso").fetchall()
+        return [(chave, url, self.caminho_objeto(hash_conteudo), bool(texto)) for chave, url, hash_conteudo, texto in linhas]
+
+    def resumo(self):
+        """Páginas, objetos e bytes comprimidos ocupados."""
+        with self._trava:
+            paginas = self._conexao.execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+            objetos = self._conexao.execute("SELECT COUNT(*) FROM objetos").fetchone()[0]
+            return {"paginas": paginas, "objetos": objetos, "bytes": self._bytes, "limite_bytes": self.limite_bytes}
+
+    # ---------- remoção ----------
+    def _remover_objeto(self, hash_conteudo, tamanho):
+        self._conexao.execute("DELETE FROM objetos WHERE hash = ?", (hash_conteudo,))
+        self._bytes -= tamanho
+        try:
+            os.remove(self.caminho_objeto(hash_conteudo))
+        except FileNotFoundError:
+            pass
+
+    def _remover_se_orfao(self, hash_conteudo):
+        if not self._conexao.execute("SELECT 1 FROM paginas WHERE hash = ? LIMIT 1", (hash_conteudo,)).fetchone():
+            linha = self._conexao.execute("SELECT tamanho FROM objetos WHERE hash = ?", (hash_conteudo,)).fetchone()
+            if linha:
+                self._remover_objeto(hash_conteudo, linha[0])
+
+    def _despejar(self):
+        """Remove os objetos menos usados (e as páginas que apontam para eles) até caber no limite."""
+        while self._bytes > self.limite_bytes:
+            antigos = self._conexao.execute(
+                "SELECT hash, tamanho FROM objetos ORDER BY acessado_em LIMIT 64").fetchall()
+            if not antigos:
+                break
+            for hash_conteudo, tamanho in antigos:
+                self._conexao.execute("DELETE FROM paginas WHERE hash = ?", (hash_conteudo,))
+                self._remover_objeto(hash_conteudo, tamanho)
+                contar("fiscalis_cache_paginas_despejos_total")
+                if self._bytes <= self.limite_bytes:
+                    break
+
+def ler_objeto(caminho, texto):
+    with open(caminho, "rb") as arquivo:
+        conteudo = zlib.decompress(arquivo.read())
+    return conteudo.decode("utf-8") if texto else conteudo
+
+# ============================================================
+# REEXTRAÇÃO EM PARALELO
+# ============================================================
+def reparsear_pagina(pagina):
+    """(chave_acesso, url, caminho, texto) -> registro com os dados reextraídos ou o erro."""
+    from extracao_nfce import extrair_dados_html
+
+    chave_acesso, url, caminho, texto = pagina
+    registro = {"chave_acesso": chave_acesso, "dados": None, "erro": None}
+    try:
+        registro["dados"] = extrair_dados_html(ler_objeto(caminho, texto), url)
+    except Exception as e:
+        registro["erro"] = f"{type(e).__name__}: {e}"
+    return registro
+
+def reparsear(cache, workers=None, chunksize=64, chaves=None):
+    """
+    Gera os registros à medida que os processos terminam (ordem não garantida).
+    Com 'chaves', só as páginas dessas notas.
+    """
+    paginas = cache.listar()
+    if chaves is not None:
+        chaves = set(chaves)
+        paginas = [pagina for pagina in paginas if pagina[0] in chaves]
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(reparsear_pagina, paginas, chunksize)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache local das páginas de NFC-e consultadas.")
+    parser.add_argument("comando", choices=["reparse", "info"])
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--saida", help="arquivo JSONL com os dados reextraídos (padrão: nenhum)")
+    parser.add_argument("--gravar", action="store_true", help="regrava as notas reextraídas no Supabase")
+    parser.add_argument("--chaves-gravadas", default="chaves_regravadas.txt",
+                        help="com --gravar, arquivo onde ficam as chaves regravadas (uma por linha)")
+    parser.add_argument("--chaves-nao-gravadas", default="chaves_nao_regravadas.txt",
+                        help="com --gravar, arquivo onde ficam as chaves dos lotes descartados")
+    parser.add_argument("--chaves", help="só reextrai as notas deste arquivo (uma chave por linha)")
+    args = parser.parse_args()
+
+    cache = CachePaginas(args.diretorio)
+    if args.comando == "info":
+        print(cache.resumo())
+        return
+
+    chaves = None
+    if args.chaves:
+        with open(args.chaves, encoding="utf-8") as arquivo:
+            chaves = [linha.strip() for linha in arquivo if linha.strip()]
+
+    gravador = chaves_gravadas = chaves_nao_gravadas = None
+    descartadas = [0]
+    if args.gravar:
+        from cliente import obter_supabase
+        from gravacao_lote import GravadorLote, montar_registros
+        chaves_gravadas = open(args.chaves_gravadas, "w", encoding="utf-8")
+        chaves_nao_gravadas = open(args.chaves_nao_gravadas, "w", encoding="utf-8")
+
+        def ao_falhar(chaves_lote, erro):
+            descartadas[0] += len(chaves_lote)
+            chaves_nao_gravadas.writelines(c + "\n" for c in chaves_lote)
+
+        gravador = GravadorLote(obter_supabase(), substituir_itens=True, ao_falhar=ao_falhar,
+                                ao_gravar=lambda chaves_lote: chaves_gravadas.writelines(c + "\n" for c in chaves_lote))
+
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else None
+    inicio = time.perf_counter()
+    total = falhas = 0
+    try:
+        for registro in reparsear(cache, args.workers, chaves=chaves):
+            total += 1
+            if registro["erro"]:
+                falhas += 1
+                print(f"{registro['chave_acesso']}: {registro['erro']}", file=sys.stderr)
+            elif gravador:
+                gravador.adicionar(*montar_registros(registro["dados"], registro["chave_acesso"]))
+            if saida:
+                saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    finally:
+        if saida:
+            saida.close()
+        if gravador:
+            gravador.fechar()
+            chaves_gravadas.close()
+            chaves_nao_gravadas.close()
+        cache.fechar()
+
+    duracao = time.perf_counter() - inicio
+    print(f"{total} páginas reextraídas ({falhas} com erro) em {duracao:.1f}s: "
+          f"{total / duracao if duracao else 0:.1f} páginas/s com {args.workers} workers.", file=sys.stderr)
+    if gravador:
+        print(f"Chaves regravadas em {args.chaves_gravadas}; atualize o espelho local com "
+              f"'python espelho_local.py --chaves {args.chaves_gravadas}'.", file=sys.stderr)
+    if descartadas[0]:
+        print(f"{descartadas[0]} notas não foram regravadas (lotes descartados). Chaves em {args.chaves_nao_gravadas}; "
+              f"refaça com 'python cache_paginas.py reparse --gravar --chaves {args.chaves_nao_gravadas}'.",
+              file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
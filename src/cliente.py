@@ -0,0 +1,45 @@
+"""
+Configuração e cliente Supabase compartilhados, criados só no primeiro uso.
+
+Importar este módulo não lê arquivos nem abre conexões: obter_config() lê o config.ini
+uma vez e obter_supabase() cria um único cliente por processo (reaproveitado em todas
+as chamadas e reexecuções do Streamlit).
+"""
+import configparser
+import os
+import threading
+
+ARQUIVO_CONFIG = 'config.ini'
+
+_trava = threading.Lock()
+_config = None
+_cliente = None
+_pid_cliente = None
+
+def obter_config():
+    """ConfigParser com o config.ini carregado (lido uma vez por processo)."""
+    global _config
+    if _config is None:
+        with _trava:
+            if _config is None:
+                config = configparser.ConfigParser()
+                config.read(ARQUIVO_CONFIG)
+                _config = config
+    return _config
+
+def obter_supabase():
+    """Cliente Supabase do processo; criado na primeira chamada (e recriado após um fork)."""
+    global _cliente, _pid_cliente
+    if _cliente is None or _pid_cliente != os.getpid():
+        with _trava:
+            if _cliente is None or _pid_cliente != os.getpid():
+                config = obter_config()
+                # Verifique se a seção 'SUPABASE' existe
+                if 'SUPABASE' not in config:
+                    print("Erro: Seção 'SUPABASE' não encontrada no arquivo de configuração.")
+                    exit(1)  # Encerra o programa se não encontrar a seção
+
+                from supabase import create_client
+                _cliente = create_client(config['SUPABASE']['SUPABASE_URL'], config['SUPABASE']['SUPABASE_KEY'])
+                _pid_cliente = os.getpid()
+    return _cliente
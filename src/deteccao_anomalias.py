@@ -0,0 +1,192 @@
+"""
+Detecção online de anomalias nas notas que chegam para gravação.
+
+Cada nota custa O(itens): as estatísticas são médias e variâncias exponenciais (EWMA) por
+forma de pagamento e por produto, e as impressões digitais das notas ficam em um LRU de
+tamanho fixo. Nada do histórico é relido.
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+
+# Tipos de anomalia
+ITEM_DIVERGENTE = "item_divergente"      # total_item != quantidade x preco_unitario
+TOTAL_DIVERGENTE = "total_divergente"    # total_venda != soma dos itens
+PICO_PRECO = "pico_preco"                # preço unitário fora do habitual para o produto
+VALOR_ATIPICO = "valor_atipico"          # total fora do habitual para a forma de pagamento
+NOTA_DUPLICADA = "nota_duplicada"        # mesmo conteúdo já visto com outra chave de acesso
+
+@dataclass
+class Anomalia:
+    tipo: str
+    chave_acesso: str
+    descricao: str
+    valor: float = None
+    esperado: float = None
+
+# ============================================================
+# ESTATÍSTICAS DE MEMÓRIA CONSTANTE
+# ============================================================
+class EstatisticaEWMA:
+    """Média e variância com peso exponencial (alfa) de uma série."""
+
+    __slots__ = ("alfa", "media", "variancia", "amostras")
+
+    def __init__(self, alfa=0.05):
+        self.alfa = alfa
+        self.media = 0.0
+        self.variancia = 0.0
+        self.amostras = 0
+
+    def escore(self, valor):
+        """Desvios-padrão entre 'valor' e a média atual (0 enquanto a variância for nula)."""
+        if self.variancia <= 0:
+            return 0.0
+        return (valor - self.media) / math.sqrt(self.variancia)
+
+    def atualizar(self, valor):
+        if self.amostras == 0:
+            self.media = valor
+        else:
+            desvio = valor - self.media
+            incremento = self.alfa * desvio
+            self.media += incremento
+            self.variancia = (1 - self.alfa) * (self.variancia + desvio * incremento)
+        self.amostras += 1
+
+class _MapaLimitado(OrderedDict):
+    """Dicionário LRU: ao passar de 'capacidade' descarta a entrada menos usada."""
+
+    def __init__(self, capacidade):
+        super().__init__()
+        self.capacidade = capacidade
+
+    def obter(self, chave, fabrica):
+        if chave in self:
+            self.move_to_end(chave)
+            return self[chave]
+        valor = self[chave] = fabrica()
+        if len(self) > self.capacidade:
+            self.popitem(last=False)
+        return valor
+
+# ============================================================
+# DETECTOR
+# ============================================================
+class DetectorAnomalias:
+    """
+    Analisa as linhas montadas por 'montar_registros' (detalhe, itens) e devolve as anomalias.
+    Preços e totais são comparados em escala logarítmica, então 'limiar_escore' mede
+    variações relativas. Os escores só valem depois de 'minimo_amostras' observações.
+    """
+
+    def __init__(self, alfa=0.05, limiar_escore=4.0, minimo_amostras=10, tolerancia=0.02,
+                 max_produtos=50_000, max_impressoes=100_000):
+        self.alfa = alfa
+        self.limiar_escore = limiar_escore
+        self.minimo_amostras = minimo_amostras
+        self.tolerancia = tolerancia
+        self.contagem = Counter()
+
+        self._por_forma = {}
+        self._por_produto = _MapaLimitado(max_produtos)
+        self._impressoes = _MapaLimitado(max_impressoes)
+        self._trava = threading.Lock()
+
+    def _diverge(self, valor, esperado):
+        # Centavo de arredondamento mais uma margem relativa
+        return abs(valor - esperado) > 0.01 + self.tolerancia * abs(esperado)
+
+    def _atipico(self, estatistica, valor):
+        if estatistica.amostras < self.minimo_amostras:
+            return False
+        return estatistica.escore(valor) > self.limiar_escore
+
+    @staticmethod
+    def _impressao(detalhe, itens):
+        partes = [str(detalhe.get("data_hora_venda")), str(detalhe.get("total_venda")), str(detalhe.get("forma_pagamento"))]
+        partes.extend(sorted(f"{i['produto']}|{i['quantidade']}|{i['total_item']}" for i in itens))
+        return hashlib.blake2b("\n".join(partes).encode("utf-8"), digest_size=16).digest()
+
+    def analisar(self, detalhe, itens):
+        chave = detalhe["chave_acesso"]
+        anomalias = []
+
+        # 1) Consistência de cada item e da soma
+        soma_itens = 0.0
+        for item in itens:
+            quantidade, preco, total = item["quantidade"], item["preco_unitario"], item["total_item"]
+            if total is not None:
+                soma_itens += total
+            if None not in (quantidade, preco, total) and self._diverge(total, quantidade * preco):
+                anomalias.append(Anomalia(ITEM_DIVERGENTE, chave, f"{item['produto']}: {quantidade} x {preco} != {total}",
+                                          total, round(quantidade * preco, 2)))
+
+        total_venda = detalhe["total_venda"]
+        if total_venda is not None and itens and self._diverge(total_venda, soma_itens):
+            anomalias.append(Anomalia(TOTAL_DIVERGENTE, chave, f"total {total_venda} != soma dos itens {soma_itens:.2f}",
+                                      total_venda, round(soma_itens, 2)))
+
+        with self._trava:
+            # 2) Mesmo conteúdo com outra chave
+            impressao = self._impressao(detalhe, itens)
+            anterior = self._impressoes.get(impressao)
+            if anterior is not None and anterior != chave:
+                anomalias.append(Anomalia(NOTA_DUPLICADA, chave, f"mesmo conteúdo da nota {anterior}"))
+            self._impressoes.obter(impressao, lambda: chave)
+
+            # 3) Picos de preço por produto
+            for item in itens:
+                preco = item["preco_unitario"]
+                if not preco or preco <= 0 or not item["produto"]:
+                    continue
+                estatistica = self._por_produto.obter(item["produto"], lambda: EstatisticaEWMA(self.alfa))
+                if self._atipico(estatistica, math.log(preco)):
+                    anomalias.append(Anomalia(PICO_PRECO, chave, f"{item['produto']}: preço {preco}",
+                                              preco, round(math.exp(estatistica.media), 2)))
+                estatistica.atualizar(math.log(preco))
+
+            # 4) Total atípico para a forma de pagamento
+            if total_venda and total_venda > 0:
+                forma = detalhe["forma_pagamento"] or ""
+                estatistica = self._por_forma.setdefault(forma, EstatisticaEWMA(self.alfa))
+                if self._atipico(estatistica, math.log(total_venda)):
+                    anomalias.append(Anomalia(VALOR_ATIPICO, chave, f"total {total_venda} em '{forma}'",
+                                              total_venda, round(math.exp(estatistica.media), 2)))
+                estatistica.atualizar(math.log(total_venda))
+
+            self.contagem.update(a.tipo for a in anomalias)
+        return anomalias
+
+# ============================================================
+# REGISTRO DURÁVEL
+# ============================================================
+class RegistroAnomalias:
+    """
+    Acrescenta cada anomalia como uma linha JSON em 'caminho' (com o instante da detecção),
+    para que fiquem disponíveis depois da execução. Thread-safe.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def registrar(self, anomalias):
+        if not anomalias:
+            return
+        instante = time.strftime("%Y-%m-%dT%H:%M:%S")
+        linhas = "".join(json.dumps({"detectado_em": instante, **asdict(a)}, ensure_ascii=False) + "\n"
+                         for a in anomalias)
+        with self._trava:
+            self._arquivo.write(linhas)
+            self._arquivo.flush()
+
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode
+from metricas import observar
+
+# ============================================================
+# DETECTOR DE QR CODE PARA FLUXO DE FRAMES
+# ============================================================
+class DetectorQR:
+    """
+    Decodifica QR Codes em um fluxo de frames gastando o mínimo de CPU:
+    - trabalha numa cópia em tons de cinza e reduzida ('escala');
+    - procura primeiro na região onde o último código foi achado;
+    - só decodifica a cada 'intervalo_frames' frames ou quando a cena muda.
+    """
+
+    def __init__(self, escala=0.5, intervalo_frames=5, limiar_mudanca=6.0, margem_roi=0.5,
+                 falhas_roi=3, janela_latencias=200):
+        self.escala = escala
+        self.intervalo_frames = max(1, intervalo_frames)
+        self.limiar_mudanca = limiar_mudanca
+        self.margem_roi = margem_roi
+        self.falhas_roi = falhas_roi
+        self.latencias = deque(maxlen=janela_latencias)  # ms por frame decodificado
+
+        self.frames = 0
+        self.decodificacoes = 0
+        self._miniatura_anterior = None
+        self._roi = None  # (x, y, largura, altura) na imagem reduzida
+        self._falhas_seguidas_roi = 0
+
+    def _cena_mudou(self, cinza):
+        miniatura = cv2.resize(cinza, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+        anterior, self._miniatura_anterior = self._miniatura_anterior, miniatura
+        if anterior is None:
+            return True
+        return float(np.abs(miniatura - anterior).mean()) > self.limiar_mudanca
+
+    def _decodificar(self, imagem, deslocamento=(0, 0)):
+        qrs = decode(imagem)
+        if not qrs:
+            return None
+        retangulo = qrs[0].rect
+        self._atualizar_roi(retangulo, deslocamento)
+        return qrs[0].data.decode("utf-8")
+
+    def _atualizar_roi(self, retangulo, deslocamento):
+        margem_x = int(retangulo.width * self.margem_roi)
+        margem_y = int(retangulo.height * self.margem_roi)
+        x = max(0, deslocamento[0] + retangulo.left - margem_x)
+        y = max(0, deslocamento[1] + retangulo.top - margem_y)
+        self._roi = (x, y, retangulo.width + 2 * margem_x, retangulo.height + 2 * margem_y)
+        self._falhas_seguidas_roi = 0
+
+    def processar(self, frame):
+        """Recebe um frame BGR (ou cinza) e retorna o texto do QR Code, ou None."""
+        self.frames += 1
+        cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if not self._cena_mudou(cinza) and self.frames % self.intervalo_frames:
+            return None
+
+        inicio = time.perf_counter()
+        if self.escala != 1:
+            reduzida = cv2.resize(cinza, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+        else:
+            reduzida = cinza
+
+        texto = None
+        if self._roi:
+            x, y, largura, altura = self._roi
+            recorte = reduzida[y:y + altura, x:x + largura]
+            texto = self._decodificar(recorte, (x, y)) if recorte.size else None
+            if not texto:
+                self._falhas_seguidas_roi += 1
+                if self._falhas_seguidas_roi >= self.falhas_roi:
+                    self._roi = None
+        if not texto:
+            texto = self._decodificar(reduzida)
+
+        self.decodificacoes += 1
+        duracao = time.perf_counter() - inicio
+        self.latencias.append(duracao * 1000)
+        observar("fiscalis_qr_decodificacao_segundos", duracao, origem="camera")
+        return texto
+
+    def estatisticas(self):
+        """Resumo da latência de decodificação (ms) e de quantos frames chegaram a ser decodificados."""
+        latencias = sorted(self.latencias)
+        if not latencias:
+            return {"frames": self.frames, "decodificacoes": 0, "latencia_media_ms": 0.0, "latencia_p95_ms": 0.0}
+        return {
+            "frames": self.frames,
+            "decodificacoes": self.decodificacoes,
+            "latencia_media_ms": sum(latencias) / len(latencias),
+            "latencia_p95_ms": latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))],
+        }
+
+# ============================================================
+# CAPTURA E DECODIFICAÇÃO EM THREADS SEPARADAS
+# ============================================================
+class LeitorCamera:
+    """
+    Lê a câmera numa thread e decodifica em outra. A decodificação sempre pega o frame
+    mais recente, então um decode lento descarta frames em vez de atrasar a captura.
+    """
+
+    def __init__(self, fonte=0, detector=None):
+        self.fonte = fonte
+        self.detector = detector or DetectorQR()
+        self.resultados = queue.Queue()
+        self.erro = None
+        self._frame = None
+        self._sequencia = 0
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        self._threads = [
+            threading.Thread(target=self._capturar, daemon=True),
+            threading.Thread(target=self._decodificar, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def _capturar(self):
+        cap = cv2.VideoCapture(self.fonte)
+        try:
+            while not self._parar.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    self.erro = "Erro ao capturar vídeo."
+                    self._parar.set()
+                    break
+                with self._condicao:
+                    self._frame = frame
+                    self._sequencia += 1
+                    self._condicao.notify_all()
+        finally:
+            cap.release()
+            with self._condicao:
+                self._condicao.notify_all()
+
+    def _decodificar(self):
+        visto = 0
+        while not self._parar.is_set():
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._sequencia != visto or self._parar.is_set())
+                frame, visto = self._frame, self._sequencia
+            if frame is None:
+                continue
+            texto = self.detector.processar(frame)
+            if texto:
+                self.resultados.put(texto)
+
+    def aguardar_frame(self, ultimo_visto, timeout=0.5):
+        """Espera um frame mais novo que 'ultimo_visto'; retorna (frame, sequencia)."""
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._sequencia != ultimo_visto or self._parar.is_set(), timeout)
+            return self._frame, self._sequencia
+
+    def resultado(self):
+        """Retorna o próximo QR decodificado, sem bloquear (ou None)."""
+        try:
+            return self.resultados.get_nowait()
+        except queue.Empty:
+            return None
@@ -0,0 +1,318 @@
+"""
+Espelho local e colunar das tabelas do Supabase (notas_fiscais, notas_detalhes, itens_nota).
+
+Uso (a partir de src/):
+    python espelho_local.py [--diretorio espelho]
+    python espelho_local.py --chaves chaves_regravadas.txt   # reespelha notas regravadas
+    python espelho_local.py --completo                       # refaz o espelho do zero
+
+Cada sincronização só traz o que é novo, página a página: cada página é acrescentada (como
+um row group) ao arquivo do seu mês, então a memória não cresce com o tamanho das tabelas.
+Os arquivos Parquet ficam particionados por mês (data_hora_venda; data_hora_leitura para
+notas_fiscais) e podem ser consultados com DuckDB:
+    conexao = conectar("espelho")
+    conexao.sql("select produto, sum(total_item) from itens_nota group by 1").df()
+
+A sincronização incremental não vê linhas reescritas no Supabase (por exemplo, pelo
+'cache_paginas.py reparse --gravar', que grava a lista das chaves regravadas): passe essas
+chaves em --chaves para substituir os detalhes e itens delas, ou use --completo.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from collections import defaultdict
+from datetime import datetime
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from paginacao import paginar, buscar_por_chaves
+
+DIRETORIO_PADRAO = "espelho"
+TAMANHO_LOTE_CHAVES = 100  # chaves por filtro 'in' (limita o tamanho da URL)
+
+ESQUEMAS = {
+    "notas_fiscais": pa.schema([
+        ("chave_acesso", pa.string()),
+        ("url", pa.string()),
+        ("data_hora_leitura", pa.timestamp("us")),
+    ]),
+    "notas_detalhes": pa.schema([
+        ("chave_acesso", pa.string()),
+        ("data_hora_venda", pa.timestamp("us")),
+        ("forma_pagamento", pa.dictionary(pa.int32(), pa.string())),
+        ("total_venda", pa.float64()),
+    ]),
+    "itens_nota": pa.schema([
+        ("chave_acesso", pa.string()),
+        ("data_hora_venda", pa.timestamp("us")),
+        ("produto", pa.dictionary(pa.int32(), pa.string())),
+        ("quantidade", pa.float64()),
+        ("preco_unitario", pa.float64()),
+        ("total_item", pa.float64()),
+    ]),
+}
+
+COLUNA_PARTICAO = {
+    "notas_fiscais": "data_hora_leitura",
+    "notas_detalhes": "data_hora_venda",
+    "itens_nota": "data_hora_venda",
+}
+
+# ============================================================
+# ESTADO DA SINCRONIZAÇÃO
+# ============================================================
+def _caminho_estado(diretorio):
+    return os.path.join(diretorio, "estado.json")
+
+def carregar_estado(diretorio):
+    try:
+        with open(_caminho_estado(diretorio), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return {"ultima_leitura": None, "sem_detalhe": []}
+
+def salvar_estado(diretorio, estado):
+    temporario = _caminho_estado(diretorio) + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo)
+    os.replace(temporario, _caminho_estado(diretorio))
+
+# ============================================================
+# ESCRITA PARTICIONADA
+# ============================================================
+def _data(valor):
+    return datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+
+class EscritorParticoes:
+    """
+    Acrescenta linhas de uma tabela aos arquivos Parquet de cada mês (um ParquetWriter aberto
+    por mês). Os arquivos só recebem o nome final em fechar(); com descartar=True (falha no
+    meio da sincronização) são apagados, e a próxima sincronização traz as linhas de novo.
+    """
+
+    def __init__(self, diretorio, tabela, sufixo):
+        self.diretorio = diretorio
+        self.tabela = tabela
+        self.sufixo = sufixo
+        self.esquema = ESQUEMAS[tabela]
+        self._escritores = {}
+
+    def _caminho(self, mes):
+        return os.path.join(self.diretorio, self.tabela, f"mes={mes}", f"parte-{self.sufixo}.parquet")
+
+    def escrever(self, linhas):
+        coluna_data = COLUNA_PARTICAO[self.tabela]
+        por_mes = defaultdict(list)
+        for linha in linhas:
+            linha = {campo.name: linha.get(campo.name) for campo in self.esquema}
+            linha[coluna_data] = _data(linha[coluna_data])
+            mes = linha[coluna_data].strftime("%Y-%m") if linha[coluna_data] else "sem_data"
+            por_mes[mes].append(linha)
+
+        for mes, registros in por_mes.items():
+            if mes not in self._escritores:
+                caminho = self._caminho(mes)
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                self._escritores[mes] = pq.ParquetWriter(caminho + ".parcial", self.esquema, compression="zstd")
+            self._escritores[mes].write_table(pa.Table.from_pylist(registros, schema=self.esquema))
+
+    def fechar(self, descartar=False):
+        """Fecha os arquivos; retorna quantos foram criados."""
+        for mes, escritor in self._escritores.items():
+            escritor.close()
+            if descartar:
+                os.remove(self._caminho(mes) + ".parcial")
+            else:
+                os.replace(self._caminho(mes) + ".parcial", self._caminho(mes))
+        criados = 0 if descartar else len(self._escritores)
+        self._escritores = {}
+        return criados
+
+def gravar_particoes(diretorio, tabela, linhas, sufixo):
+    """Grava as linhas em um arquivo Parquet por mês. Retorna quantos arquivos foram criados."""
+    escritor = EscritorParticoes(diretorio, tabela, sufixo)
+    escritor.escrever(linhas)
+    return escritor.fechar()
+
+# ============================================================
+# SINCRONIZAÇÃO INCREMENTAL
+# ============================================================
+def _em_lotes(valores, tamanho):
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+def _trazer_detalhes(cliente, chaves, escritores, resumo, sem_detalhe):
+    """Grava detalhes e itens das chaves que já foram raspadas; as demais vão para 'sem_detalhe'."""
+    for lote in _em_lotes(chaves, TAMANHO_LOTE_CHAVES):
+        detalhes = [d for pagina in buscar_por_chaves(cliente, "notas_detalhes", "*", lote) for d in pagina]
+        datas = {d["chave_acesso"]: d["data_hora_venda"] for d in detalhes}
+        sem_detalhe.extend(c for c in lote if c not in datas)
+        if not detalhes:
+            continue
+        escritores["notas_detalhes"].escrever(detalhes)
+        resumo["notas_detalhes"] += len(detalhes)
+        for itens in buscar_por_chaves(cliente, "itens_nota", "*", list(datas)):
+            for item in itens:
+                item["data_hora_venda"] = datas[item["chave_acesso"]]
+            escritores["itens_nota"].escrever(itens)
+            resumo["itens_nota"] += len(itens)
+
+def sincronizar(cliente, diretorio=DIRETORIO_PADRAO):
+    """
+    Traz as notas lidas desde a última sincronização e os detalhes/itens das notas que ainda
+    não tinham sido raspadas. Retorna um resumo com a quantidade de linhas de cada tabela.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    estado = carregar_estado(diretorio)
+    sufixo = f"{int(time.time() * 1000)}"
+    escritores = {tabela: EscritorParticoes(diretorio, tabela, sufixo) for tabela in ESQUEMAS}
+    resumo = {tabela: 0 for tabela in ESQUEMAS}
+    sem_detalhe = []
+
+    def trazer_detalhes(chaves):
+        _trazer_detalhes(cliente, chaves, escritores, resumo, sem_detalhe)
+
+    ultima = estado["ultima_leitura"]
+    try:
+        # 1) Notas que ainda esperavam a raspagem na sincronização anterior
+        trazer_detalhes(estado["sem_detalhe"])
+
+        # 2) Notas fiscais novas (pela data de leitura), com os detalhes e itens de cada página
+        filtro = (lambda q: q.gt("data_hora_leitura", ultima)) if ultima else None
+        pendentes = set(estado["sem_detalhe"])
+        for pagina in paginar(cliente, "notas_fiscais", "chave_acesso,url,data_hora_leitura", filtros=filtro):
+            escritores["notas_fiscais"].escrever(pagina)
+            resumo["notas_fiscais"] += len(pagina)
+            estado["ultima_leitura"] = max([estado["ultima_leitura"] or ""] +
+                                           [n["data_hora_leitura"] for n in pagina if n["data_hora_leitura"]]) or None
+            trazer_detalhes([n["chave_acesso"] for n in pagina if n["chave_acesso"] and n["chave_acesso"] not in pendentes])
+    except Exception:
+        for escritor in escritores.values():
+            escritor.fechar(descartar=True)
+        raise
+
+    for escritor in escritores.values():
+        escritor.fechar()
+    estado["sem_detalhe"] = list(dict.fromkeys(sem_detalhe))
+    salvar_estado(diretorio, estado)
+
+    resumo["aguardando_detalhe"] = len(estado["sem_detalhe"])
+    logging.info(f"Espelho sincronizado: {resumo}")
+    return resumo
+
+# ============================================================
+# REESPELHAMENTO DE NOTAS REGRAVADAS
+# ============================================================
+def remover_chaves(diretorio, tabela, chaves):
+    """Reescreve os arquivos de 'tabela' que têm linhas das 'chaves', sem essas linhas. Retorna quantas saíram."""
+    import pyarrow.compute as pc
+
+    raiz = os.path.join(diretorio, tabela)
+    if not os.path.isdir(raiz):
+        return 0
+    valores = pa.array(list(chaves), pa.string())
+    removidas = 0
+    for pasta, _, arquivos in os.walk(raiz):
+        for nome in arquivos:
+            if not nome.endswith(".parquet"):
+                continue
+            caminho = os.path.join(pasta, nome)
+            coluna = pq.read_table(caminho, columns=["chave_acesso"])["chave_acesso"]
+            alvo = pc.is_in(coluna, value_set=valores)
+            quantas = pc.sum(alvo).as_py() or 0
+            if not quantas:
+                continue
+            restante = pq.read_table(caminho).filter(pc.invert(alvo))
+            if restante.num_rows:
+                pq.write_table(restante, caminho + ".tmp", compression="zstd")
+                os.replace(caminho + ".tmp", caminho)
+            else:
+                os.remove(caminho)
+            removidas += quantas
+    return removidas
+
+def atualizar_chaves(cliente, chaves, diretorio=DIRETORIO_PADRAO):
+    """
+    Substitui no espelho os detalhes e itens das 'chaves' pelos atuais do Supabase. As linhas
+    novas são gravadas antes de as antigas saírem e só recebem o nome final depois.
+    """
+    chaves = list(dict.fromkeys(c for c in chaves if c))
+    estado = carregar_estado(diretorio)
+    sufixo = f"{int(time.time() * 1000)}"
+    escritores = {tabela: EscritorParticoes(diretorio, tabela, sufixo) for tabela in ("notas_detalhes", "itens_nota")}
+    resumo = {tabela: 0 for tabela in escritores}
+    sem_detalhe = []
+    try:
+        _trazer_detalhes(cliente, chaves, escritores, resumo, sem_detalhe)
+        removidas = {tabela: remover_chaves(diretorio, tabela, chaves) for tabela in escritores}
+    except Exception:
+        for escritor in escritores.values():
+            escritor.fechar(descartar=True)
+        raise
+    for escritor in escritores.values():
+        escritor.fechar()
+
+    # Notas que perderam o detalhe no Supabase voltam a esperar por ele
+    estado["sem_detalhe"] = list(dict.fromkeys(estado["sem_detalhe"] + sem_detalhe))
+    salvar_estado(diretorio, estado)
+
+    resumo.update({f"{tabela}_removidas": quantas for tabela, quantas in removidas.items()})
+    resumo["aguardando_detalhe"] = len(sem_detalhe)
+    logging.info(f"Espelho atualizado para {len(chaves)} chaves: {resumo}")
+    return resumo
+
+def reconstruir(cliente, diretorio=DIRETORIO_PADRAO):
+    """Refaz o espelho do zero em um diretório ao lado e troca pelo atual só no fim."""
+    novo = diretorio.rstrip(os.sep) + ".novo"
+    shutil.rmtree(novo, ignore_errors=True)
+    resumo = sincronizar(cliente, novo)
+    antigo = diretorio.rstrip(os.sep) + ".antigo"
+    if os.path.isdir(diretorio):
+        os.replace(diretorio, antigo)
+    os.replace(novo, diretorio)
+    shutil.rmtree(antigo, ignore_errors=True)
+    return resumo
+
+# ============================================================
+# CONSULTA COM DUCKDB
+# ============================================================
+def conectar(diretorio=DIRETORIO_PADRAO):
+    """Abre uma conexão DuckDB com uma view para cada tabela espelhada."""
+    conexao = duckdb.connect()
+    for tabela, esquema in ESQUEMAS.items():
+        padrao = os.path.join(diretorio, tabela, "*", "*.parquet")
+        if os.path.isdir(os.path.join(diretorio, tabela)):
+            conexao.execute(
+                f"CREATE VIEW {tabela} AS SELECT * EXCLUDE (mes) "
+                f"FROM read_parquet('{padrao}', hive_partitioning = true, union_by_name = true)"
+            )
+        else:
+            # Espelho ainda vazio: view sem linhas, mas com as colunas certas
+            vazio = pa.Table.from_pylist([], schema=esquema)
+            conexao.register(f"_{tabela}_vazia", vazio)
+            conexao.execute(f"CREATE VIEW {tabela} AS SELECT * FROM _{tabela}_vazia")
+    return conexao
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza o espelho local das tabelas do Supabase.")
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO)
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--chaves", help="arquivo com uma chave de acesso por linha: substitui detalhes e itens delas")
+    modo.add_argument("--completo", action="store_true", help="refaz o espelho inteiro")
+    args = parser.parse_args()
+
+    from cliente import obter_supabase
+    if args.chaves:
+        with open(args.chaves, encoding="utf-8") as arquivo:
+            chaves = [linha.strip() for linha in arquivo]
+        print(atualizar_chaves(obter_supabase(), chaves, args.diretorio))
+    elif args.completo:
+        print(reconstruir(obter_supabase(), args.diretorio))
+    else:
+        print(sincronizar(obter_supabase(), args.diretorio))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Exportação das tabelas do Supabase (notas_fiscais, notas_detalhes, itens_nota) em CSV,
+JSONL ou Parquet, página a página: só uma página de linhas fica em memória por vez.
+
+Uso (a partir de src/):
+    python exportacao.py [--formato csv|jsonl|parquet] [--saida exportacao] [--desde 2025-01-01T00:00:00]
+    python exportacao.py --estado exportacao_estado.json
+
+Com --desde, só entram as notas lidas depois do instante informado (data_hora_leitura) e
+os detalhes e itens dessas notas. Como a raspagem acontece depois da leitura, notas ainda
+sem detalhe ficam de fora de 'notas_detalhes' e 'itens_nota'; --estado guarda a última
+leitura exportada e essas chaves, e a próxima execução começa da leitura guardada e traz
+os detalhes e itens das notas que estavam esperando (como o sem_detalhe do espelho local).
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+from datetime import datetime
+from paginacao import paginar, buscar_por_chaves, LIMITE_RESPOSTA
+
+DIRETORIO_PADRAO = "exportacao"
+ESTADO_INICIAL = {"ultima_leitura": None, "sem_detalhe": []}
+TAMANHO_PAGINA = LIMITE_RESPOSTA
+TAMANHO_LOTE_CHAVES = 100  # chaves por filtro 'in' (limita o tamanho da URL)
+
+TABELAS = ["notas_fiscais", "notas_detalhes", "itens_nota"]
+
+COLUNAS = {
+    "notas_fiscais": ["chave_acesso", "url", "data_hora_leitura"],
+    "notas_detalhes": ["chave_acesso", "data_hora_venda", "forma_pagamento", "total_venda"],
+    "itens_nota": ["chave_acesso", "produto", "quantidade", "preco_unitario", "total_item"],
+}
+
+COLUNAS_DATA = {"data_hora_leitura", "data_hora_venda"}
+
+# ============================================================
+# LEITURA PAGINADA
+# ============================================================
+def _em_lotes(valores, tamanho):
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+def _lotes_incrementais(cliente, desde, pendentes, tamanho_pagina):
+    """Lotes de chaves do modo incremental: as que esperavam detalhe e as das notas lidas depois de 'desde'."""
+    yield from _em_lotes(list(pendentes), TAMANHO_LOTE_CHAVES)
+    ja_incluidas = set(pendentes)
+    filtro = (lambda q: q.gt("data_hora_leitura", desde)) if desde else None
+    for pagina in paginar(cliente, "notas_fiscais", "chave_acesso", tamanho_pagina=tamanho_pagina, filtros=filtro):
+        chaves = [linha["chave_acesso"] for linha in pagina
+                  if linha["chave_acesso"] and linha["chave_acesso"] not in ja_incluidas]
+        yield from _em_lotes(chaves, TAMANHO_LOTE_CHAVES)
+
+def paginas_tabela(cliente, tabela, desde=None, tamanho_pagina=TAMANHO_PAGINA, pendentes=None, sem_detalhe=None):
+    """
+    Gera as linhas de 'tabela' em páginas (listas de dicionários), ordenadas por chave de acesso.
+    Com 'desde' (ou 'pendentes', a lista de chaves que esperavam detalhe), o modo é incremental:
+    só as notas com data_hora_leitura posterior, e os detalhes e itens delas e das pendentes.
+    No modo incremental, 'sem_detalhe' (um set) recebe as chaves sem linha em 'notas_detalhes'
+    durante a exportação dessa tabela, e os itens dessas chaves ficam para quando o detalhe chegar.
+    """
+    filtro = (lambda q: q.gt("data_hora_leitura", desde)) if desde else None
+    if tabela == "notas_fiscais":
+        yield from paginar(cliente, tabela, ",".join(COLUNAS[tabela]), tamanho_pagina=tamanho_pagina, filtros=filtro)
+        return
+
+    incremental = desde or pendentes is not None
+    if not incremental:
+        if tabela == "notas_detalhes":
+            yield from paginar(cliente, tabela, ",".join(COLUNAS[tabela]), tamanho_pagina=tamanho_pagina)
+            return
+        # itens_nota não tem chave única: as chaves vêm de 'notas_detalhes' e os itens são buscados por lote
+        for pagina in paginar(cliente, "notas_detalhes", "chave_acesso", tamanho_pagina=tamanho_pagina):
+            chaves = [linha["chave_acesso"] for linha in pagina if linha["chave_acesso"]]
+            for lote in _em_lotes(chaves, TAMANHO_LOTE_CHAVES):
+                yield from buscar_por_chaves(cliente, tabela, ",".join(COLUNAS[tabela]), lote, limite=tamanho_pagina)
+        return
+
+    for lote in _lotes_incrementais(cliente, desde, pendentes or [], tamanho_pagina):
+        if tabela == "notas_detalhes":
+            encontradas = set()
+            for pagina in buscar_por_chaves(cliente, tabela, ",".join(COLUNAS[tabela]), lote, limite=tamanho_pagina):
+                encontradas.update(linha["chave_acesso"] for linha in pagina)
+                yield pagina
+            if sem_detalhe is not None:
+                sem_detalhe.update(c for c in lote if c not in encontradas)
+            continue
+
+        # Itens só das notas que já têm detalhe, para não exportá-los de novo quando o detalhe chegar
+        if sem_detalhe is not None:
+            lote = [c for c in lote if c not in sem_detalhe]
+        else:
+            lote = [linha["chave_acesso"] for pagina in buscar_por_chaves(cliente, "notas_detalhes", "chave_acesso", lote)
+                    for linha in pagina]
+        if lote:
+            yield from buscar_por_chaves(cliente, tabela, ",".join(COLUNAS[tabela]), lote, limite=tamanho_pagina)
+
+# ============================================================
+# ESCRITORES INCREMENTAIS
+# ============================================================
+class EscritorCSV:
+    extensao = "csv"
+
+    def __init__(self, caminho, tabela):
+        self._arquivo = open(caminho, "w", encoding="utf-8", newline="")
+        self._escritor = csv.DictWriter(self._arquivo, fieldnames=COLUNAS[tabela], extrasaction="ignore")
+        self._escritor.writeheader()
+
+    def escrever(self, linhas):
+        self._escritor.writerows(linhas)
+
+    def fechar(self):
+        self._arquivo.close()
+
+class EscritorJSONL:
+    extensao = "jsonl"
+
+    def __init__(self, caminho, tabela):
+        self._arquivo = open(caminho, "w", encoding="utf-8")
+        self._colunas = COLUNAS[tabela]
+
+    def escrever(self, linhas):
+        self._arquivo.writelines(
+            json.dumps({c: linha.get(c) for c in self._colunas}, ensure_ascii=False, default=str) + "\n"
+            for linha in linhas
+        )
+
+    def fechar(self):
+        self._arquivo.close()
+
+class EscritorParquet:
+    """Um row group por página, gravado assim que a página chega (pyarrow.parquet.ParquetWriter)."""
+    extensao = "parquet"
+
+    def __init__(self, caminho, tabela):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tipos = {"chave_acesso": pa.string(), "url": pa.string(), "forma_pagamento": pa.string(),
+                 "produto": pa.string(), "data_hora_leitura": pa.timestamp("us"),
+                 "data_hora_venda": pa.timestamp("us")}
+        self._pa = pa
+        self._esquema = pa.schema([(c, tipos.get(c, pa.float64())) for c in COLUNAS[tabela]])
+        self._escritor = pq.ParquetWriter(caminho, self._esquema, compression="zstd")
+
+    def escrever(self, linhas):
+        colunas = {}
+        for campo in self._esquema:
+            valores = [linha.get(campo.name) for linha in linhas]
+            if campo.name in COLUNAS_DATA:
+                valores = [datetime.fromisoformat(v) if isinstance(v, str) else v for v in valores]
+            colunas[campo.name] = valores
+        self._escritor.write_table(self._pa.Table.from_pydict(colunas, schema=self._esquema))
+
+    def fechar(self):
+        self._escritor.close()
+
+ESCRITORES = {"csv": EscritorCSV, "jsonl": EscritorJSONL, "parquet": EscritorParquet}
+
+# ============================================================
+# EXPORTAÇÃO
+# ============================================================
+def exportar(cliente, diretorio=DIRETORIO_PADRAO, formato="csv", tabelas=TABELAS, desde=None,
+             tamanho_pagina=TAMANHO_PAGINA, pendentes=None):
+    """
+    Grava um arquivo por tabela em 'diretorio'. Cada arquivo é escrito com outro nome e só
+    renomeado no fim, então uma exportação interrompida não deixa arquivo pela metade.
+    Retorna {tabela: linhas, ..., "ultima_leitura": maior data_hora_leitura exportada (ou
+    'desde', se não houver nota nova)} e, no modo incremental, "sem_detalhe": as chaves que
+    continuam esperando detalhe (a passar como 'pendentes' na próxima exportação).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    classe = ESCRITORES[formato]
+    resumo = {"ultima_leitura": desde}
+    incremental = desde or pendentes is not None
+    sem_detalhe = None
+    for tabela in tabelas:
+        caminho = os.path.join(diretorio, f"{tabela}.{classe.extensao}")
+        temporario = caminho + ".parcial"
+        escritor = classe(temporario, tabela)
+        linhas = 0
+        if incremental and tabela == "notas_detalhes":
+            sem_detalhe = set()
+        try:
+            for pagina in paginas_tabela(cliente, tabela, desde, tamanho_pagina, pendentes, sem_detalhe):
+                escritor.escrever(pagina)
+                linhas += len(pagina)
+                if tabela == "notas_fiscais":
+                    leituras = [l["data_hora_leitura"] for l in pagina if l.get("data_hora_leitura")]
+                    resumo["ultima_leitura"] = max(leituras + [resumo["ultima_leitura"] or ""]) or None
+        finally:
+            escritor.fechar()
+        os.replace(temporario, caminho)
+        resumo[tabela] = linhas
+        logging.info(f"Exportadas {linhas} linhas de '{tabela}' para {caminho}")
+    if incremental:
+        # Sem exportar 'notas_detalhes' não há como saber quais chaves ganharam detalhe
+        resumo["sem_detalhe"] = sorted(sem_detalhe) if sem_detalhe is not None else list(pendentes or [])
+    return resumo
+
+def carregar_estado(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return dict(ESTADO_INICIAL)
+
+def salvar_estado(caminho, estado):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo)
+    os.replace(temporario, caminho)
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta as tabelas do Supabase em páginas (CSV, JSONL ou Parquet).")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="csv")
+    parser.add_argument("--saida", default=DIRETORIO_PADRAO, help="diretório dos arquivos exportados")
+    parser.add_argument("--tabelas", nargs="+", choices=TABELAS, default=TABELAS)
+    parser.add_argument("--desde", help="só notas lidas depois deste instante (ISO 8601, data_hora_leitura)")
+    parser.add_argument("--estado", help="arquivo JSON com a última leitura exportada e as notas que esperam detalhe; "
+                                         "lido no início e atualizado no fim (exportação incremental encadeada)")
+    args = parser.parse_args()
+
+    from cliente import obter_supabase
+    estado = carregar_estado(args.estado) if args.estado else None
+    desde = args.desde or (estado and estado["ultima_leitura"])
+    pendentes = estado["sem_detalhe"] if estado else None
+    resumo = exportar(obter_supabase(), args.saida, args.formato, args.tabelas, desde, pendentes=pendentes)
+    if args.estado:
+        salvar_estado(args.estado, {"ultima_leitura": resumo["ultima_leitura"], "sem_detalhe": resumo["sem_detalhe"]})
+    if "sem_detalhe" in resumo:
+        resumo["aguardando_detalhe"] = len(resumo.pop("sem_detalhe"))
+    print(resumo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import re
+import threading
+from urllib.parse import urljoin
+import lxml.html
+from metricas import cronometrar
+
+# ===============================================
+# XPATHS DO DOCUMENTO DANFE NFC-e (compartilhados com o caminho Selenium)
+# ===============================================
+XPATH_IFRAME = '//iframe[contains(@src, "danfeNFCe")]'
+XPATH_EMISSAO = '/html/body/div[1]/div[4]/div/div[2]/div[2]/div[1]/div/ul/li'
+XPATH_LINHAS = '/html/body/div[1]/div[4]/div/div[2]/div[1]/table/tbody/tr'
+XPATH_TOTAL = '/html/body/div[1]/div[4]/div/div[2]/div[1]/div[3]/div[2]/span'
+XPATH_FORMA_PAGAMENTO = '/html/body/div[1]/div[4]/div/div[2]/div[1]/div[3]/div[4]/label'
+
+# O navegador insere <tbody> sozinho; no HTML bruto ele pode não existir
+XPATH_LINHAS_SEM_TBODY = '/html/body/div[1]/div[4]/div/div[2]/div[1]/table/tr'
+
+PADRAO_EMISSAO = re.compile(r"Emissão:\s*(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})")
+
+class ExtracaoEstaticaFalhou(Exception):
+    """O documento não tem a estrutura esperada sem execução de JavaScript."""
+
+class PortalSobrecarregado(Exception):
+    """O portal pediu para reduzir o ritmo (HTTP 429/503). 'espera' vem do Retry-After, se houver."""
+
+    def __init__(self, mensagem, espera=None):
+        super().__init__(mensagem)
+        self.espera = espera
+
+STATUS_SOBRECARGA = (429, 503)
+
+# ===============================================
+# SESSÃO HTTP COM POOL DE CONEXÕES
+# ===============================================
+_sessao = None
+_trava_sessao = threading.Lock()
+
+def obter_sessao(tamanho_pool=16):
+    """Retorna a sessão HTTP compartilhada (keep-alive e pool de conexões por host)."""
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            # requests só é importado quando o caminho HTTP é usado pela primeira vez
+            import requests
+            import urllib3
+            from requests.adapters import HTTPAdapter
+
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            # Mesmo comportamento do Chrome com --ignore-certificate-errors
+            sessao.verify = False
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            sessao.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+            _sessao = sessao
+        return _sessao
+
+def _texto(elemento):
+    """Texto visível do elemento com espaços normalizados (equivalente ao .text do Selenium)."""
+    return " ".join(elemento.text_content().split())
+
+# ===============================================
+# DOWNLOAD DO DOCUMENTO DO IFRAME
+# ===============================================
+def _verificar_resposta(resposta):
+    """raise_for_status, mas 429/503 viram PortalSobrecarregado (não adianta tentar com o Selenium)."""
+    if resposta.status_code in STATUS_SOBRECARGA:
+        retry_after = resposta.headers.get("Retry-After", "")
+        espera = float(retry_after) if retry_after.strip().isdigit() else None
+        raise PortalSobrecarregado(f"HTTP {resposta.status_code} em {resposta.url}", espera)
+    resposta.raise_for_status()
+
+def baixar_documento_danfe(url, sessao=None, timeout=15):
+    """Baixa a página de consulta e, em seguida, o documento do iframe 'danfeNFCe'."""
+    sessao = sessao or obter_sessao()
+    with cronometrar("fiscalis_pagina_carregamento_segundos", caminho="http"):
+        resposta = sessao.get(url, timeout=timeout)
+    _verificar_resposta(resposta)
+
+    pagina = lxml.html.fromstring(resposta.content)
+    iframes = pagina.xpath(XPATH_IFRAME)
+    if not iframes:
+        raise ExtracaoEstaticaFalhou(f"Iframe 'danfeNFCe' não encontrado em {url}")
+
+    url_iframe = urljoin(resposta.url, iframes[0].get("src"))
+    with cronometrar("fiscalis_iframe_espera_segundos", caminho="http"):
+        resposta = sessao.get(url_iframe, timeout=timeout)
+    _verificar_resposta(resposta)
+    return resposta.content
+
+# ===============================================
+# PARSE ESTÁTICO DO DOCUMENTO
+# ===============================================
+def extrair_dados_html(html, url):
+    """Extrai o mesmo dicionário 'dados' do caminho Selenium a partir do HTML do iframe."""
+    documento = lxml.html.fromstring(html)
+
+    dados = {
+        "url": url,
+        "produtos": []
+    }
+
+    emissao = documento.xpath(XPATH_EMISSAO)
+    if not emissao:
+        raise ExtracaoEstaticaFalhou("Data de emissão não encontrada.")
+    match = PADRAO_EMISSAO.search(_texto(emissao[0]))
+    dados["data_hora_venda"] = match.group(1) if match else None
+
+    linhas = documento.xpath(XPATH_LINHAS) or documento.xpath(XPATH_LINHAS_SEM_TBODY)
+    if not linhas:
+        raise ExtracaoEstaticaFalhou("Nenhuma linha de produto encontrada.")
+    for linha in linhas:
+        nome = linha.xpath('.//td[1]/span[1]')
+        quantidade = linha.xpath('.//td[1]/span[3]')
+        preco_unitario = linha.xpath('.//td[1]/span[5]')
+        total_item = linha.xpath('.//td[2]/span')
+        if not (nome and quantidade and preco_unitario and total_item):
+            raise ExtracaoEstaticaFalhou("Linha de produto com estrutura inesperada.")
+
+        dados["produtos"].append({
+            "produto": _texto(nome[0]),
+            "quantidade": _texto(quantidade[0]),
+            "preco_unitario": _texto(preco_unitario[0]),
+            "valor_total": _texto(total_item[0])
+        })
+
+    total = documento.xpath(XPATH_TOTAL)
+    forma_pg = documento.xpath(XPATH_FORMA_PAGAMENTO)
+    if not total or not forma_pg:
+        raise ExtracaoEstaticaFalhou("Total ou forma de pagamento não encontrados.")
+    dados["total_venda"] = _texto(total[0])
+    dados["forma_pagamento"] = _texto(forma_pg[0])
+
+    return dados
+
+def consultar_nfce_http(url, sessao=None, timeout=15):
+    """Caminho rápido: HTTP puro + lxml. Lança exceção se precisar do navegador."""
+    html = baixar_documento_danfe(url, sessao=sessao, timeout=timeout)
+    return extrair_dados_html(html, url)
@@ -0,0 +1,35 @@
+import re
+
+PADRAO_CHAVE = re.compile(r"[0-9]{44}")
+
+# ============================================================
+# EXTRAÇÃO DE URL E CHAVE DE ACESSO
+# ============================================================
+def extrair_dados(qr_text):
+    url = qr_text.strip()  # Mantém EXATAMENTE como vem
+    encontrado = PADRAO_CHAVE.findall(url)
+    chave = encontrado[0] if encontrado else None
+    return {"url_cupom": url, "chave_acesso": chave}
+
+# ============================================================
+# VALIDAÇÃO DA CHAVE DE ACESSO (dígito verificador módulo 11)
+# ============================================================
+def digito_verificador(chave43):
+    """Dígito verificador (módulo 11, pesos 2 a 9) dos 43 primeiros dígitos da chave."""
+    soma = 0
+    peso = 2
+    for digito in reversed(chave43):
+        soma += int(digito) * peso
+        peso = 2 if peso == 9 else peso + 1
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+def chave_valida(chave):
+    """Confere o 44º dígito da chave de acesso."""
+    if not chave or len(chave) != 44 or not chave.isdigit():
+        return False
+    return digito_verificador(chave[:43]) == int(chave[43])
+
+def chaves_validas(texto):
+    """Todas as chaves de 44 dígitos com dígito verificador correto, sem repetição."""
+    return list(dict.fromkeys(c for c in PADRAO_CHAVE.findall(texto) if chave_valida(c)))
@@ -1,41 +1,27 @@
-import cv2
-import re
+import logging
 from datetime import datetime
-from pyzbar.pyzbar import decode
-from supabase import create_client
 import streamlit as st
-import numpy as np
-from PIL import Image
-import configparser
-
-# Crie um objeto ConfigParser
-config = configparser.ConfigParser()
-
-# Leia o arquivo de configuração
-config.read('config.ini')
-
-# Verifique se a seção 'SUPABASE' existe
-if 'SUPABASE' in config:
-    SUPABASE_URL = config['SUPABASE']['SUPABASE_URL']
-    SUPABASE_KEY = config['SUPABASE']['SUPABASE_KEY']
-else:
-    print("Erro: Seção 'SUPABASE' não encontrada no arquivo de configuração.")
-    exit(1)  # Encerra o programa se não encontrar a seção
-
-# Cria o cliente do Supabase com as variáveis carregadas
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# ============================================================
-# FUNÇÃO PARA LER QR CODE (webcam ou imagem)
-# ============================================================
-def ler_qrcode(frame):
-    """
-    Detecta o QR Code em um frame da câmera.
-    """
-    qrs = decode(frame)
-    if qrs:
-        return qrs[0].data.decode("utf-8")
-    return None
+from extracao_qr import extrair_dados
+from cache_chaves import CacheChaves
+from cliente import obter_config, obter_supabase
+from metricas import cronometrar, iniciar_servidor, SnapshotPeriodico
+from paginacao import buscar_pagina
+
+# Configuração e cliente do Supabase são carregados no primeiro uso (ver cliente.py);
+# cv2, pyzbar e o pipeline só são importados pela funcionalidade que os usa
+config = obter_config()
+
+# Ingestão imediata: a nota recém-lida segue direto para consulta e gravação dos detalhes
+INGESTAO_IMEDIATA = config.getboolean('FASE1', 'INGESTAO_IMEDIATA', fallback=False)
+# Chaves exibidas por página em "Exibir Chaves Salvas"
+CHAVES_POR_PAGINA = config.getint('FASE1', 'CHAVES_POR_PAGINA', fallback=100)
+
+# Métricas da leitura de QR (seção opcional 'METRICAS'); porta e snapshot próprios, para não
+# disputar com a fase 2 quando as duas rodam na mesma máquina
+PORTA_METRICAS = config.getint('METRICAS', 'PORTA_FASE1', fallback=0)
+ENDERECO_METRICAS = config.get('METRICAS', 'ENDERECO', fallback='127.0.0.1')
+ARQUIVO_METRICAS = config.get('METRICAS', 'ARQUIVO_SNAPSHOT_FASE1', fallback='')
+INTERVALO_METRICAS = config.getfloat('METRICAS', 'INTERVALO_SNAPSHOT', fallback=15.0)
 
 # ============================================================
 # FUNÇÃO PARA LER QR CODE DE IMAGEM UPLOAD
@@ -43,27 +29,15 @@ def ler_qrcode(frame):
 def ler_qrcode_imagem(uploaded_file):
     """
     Detecta e lê o QR Code de uma imagem carregada.
+    Se a leitura direta falhar, tenta tons de cinza, limiarização e reescala.
     """
-    # Abrir a imagem usando PIL
-    img = Image.open(uploaded_file)
-    img = np.array(img)
-
-    # Usando pyzbar para detectar QR Code
-    qrs = decode(img)
-    if qrs:
-        return qrs[0].data.decode("utf-8")
+    from lote_qr import abrir_imagem, decodificar_imagem
+    with cronometrar("fiscalis_qr_decodificacao_segundos", origem="imagem"):
+        textos = decodificar_imagem(abrir_imagem(uploaded_file))
+    if textos:
+        return textos[0]
     return None
 
-# ============================================================
-# EXTRAÇÃO DE URL E CHAVE DE ACESSO
-# ============================================================
-def extrair_dados(qr_text):
-    url = qr_text.strip()  # Mantém EXATAMENTE como vem
-    padrao_chave = r"[0-9]{44}"
-    encontrado = re.findall(padrao_chave, url)
-    chave = encontrado[0] if encontrado else None
-    return {"url_cupom": url, "chave_acesso": chave}
-
 # ============================================================
 # FUNÇÃO PARA SALVAR NO SUPABASE
 # ============================================================
@@ -73,21 +47,81 @@ def salvar_supabase(url, chave):
         "chave_acesso": chave,
         "data_hora_leitura": datetime.now().isoformat()
     }
-    return supabase.table("notas_fiscais").insert(data).execute()
+    resultado = obter_supabase().table("notas_fiscais").insert(data).execute()
+    obter_cache_chaves().adicionar(chave)
+    return resultado
+
+# ============================================================
+# CACHE LOCAL DAS CHAVES JÁ CADASTRADAS
+# ============================================================
+@st.cache_resource
+def obter_cache_chaves():
+    """Carrega as chaves cadastradas uma vez por processo (select paginado)."""
+    cache = CacheChaves()
+    cache.aquecer(obter_supabase())
+    return cache
+
+def chave_ja_cadastrada(chave):
+    """Verifica a chave no cache local; o Supabase só é consultado quando ela não está lá."""
+    cache = obter_cache_chaves()
+    if cache.contem(chave):
+        return True
+    existe = obter_supabase().table("notas_fiscais").select("chave_acesso").eq("chave_acesso", chave).execute()
+    if existe.data:
+        cache.adicionar(chave)
+        return True
+    return False
+
+# ============================================================
+# MÉTRICAS
+# ============================================================
+@st.cache_resource
+def iniciar_metricas():
+    """Endpoint /metrics e snapshot JSON, iniciados uma vez por processo do Streamlit."""
+    servidor = snapshot = None
+    try:
+        if PORTA_METRICAS:
+            servidor = iniciar_servidor(PORTA_METRICAS, endereco=ENDERECO_METRICAS)
+        if ARQUIVO_METRICAS:
+            snapshot = SnapshotPeriodico(ARQUIVO_METRICAS, INTERVALO_METRICAS)
+    except OSError as e:
+        logging.error(f"Erro ao iniciar as métricas da fase 1: {e}")
+    return servidor, snapshot
+
+# ============================================================
+# PIPELINE DE INGESTÃO EM SEGUNDO PLANO
+# ============================================================
+@st.cache_resource
+def obter_pipeline():
+    """Pipeline compartilhado entre as execuções do Streamlit (uma thread por processo)."""
+    from pipeline import PipelineIngestao
+    return PipelineIngestao(obter_supabase()).iniciar_em_segundo_plano()
+
+def enviar_para_ingestao(texto_qr):
+    if INGESTAO_IMEDIATA:
+        obter_pipeline().enviar(texto_qr)
 
 # ============================================================
 # FUNÇÃO PARA EXIBIR AS CHAVES DE ACESSO CADASTRADAS
 # ============================================================
 def exibir_chaves_cadastradas():
-    # Busca as chaves de acesso já cadastradas no Supabase
-    resultado = supabase.table("notas_fiscais").select("chave_acesso").execute()
+    # Busca só uma página de chaves por vez (paginação por chave, como na exportação);
+    # a sessão guarda o cursor (última chave da página anterior) de cada página visitada
+    cursores = st.session_state.setdefault("cursores_chaves", [None])
+    pagina = buscar_pagina(obter_supabase(), "notas_fiscais", "chave_acesso",
+                           tamanho_pagina=CHAVES_POR_PAGINA, apos=cursores[-1])
 
-    if resultado.data:
+    if pagina or len(cursores) > 1:
         st.subheader("Chaves de Acesso Cadastradas:")
         with st.expander("Ver chaves cadastradas"):
-            # Exibe a lista de chaves com uma altura máxima
-            for i, item in enumerate(resultado.data):
-                st.write(f"{i+1}. {item['chave_acesso']}")
+            inicio = (len(cursores) - 1) * CHAVES_POR_PAGINA
+            for i, item in enumerate(pagina, start=inicio + 1):
+                st.write(f"{i}. {item['chave_acesso']}")
+
+            anterior, proxima = st.columns(2)
+            anterior.button("Página anterior", disabled=len(cursores) == 1, on_click=cursores.pop)
+            proxima.button("Próxima página", disabled=len(pagina) < CHAVES_POR_PAGINA, on_click=cursores.append,
+                           args=(pagina[-1]["chave_acesso"] if pagina else None,))
     else:
         st.write("Nenhuma chave de acesso encontrada.")
 
@@ -95,6 +129,7 @@ def exibir_chaves_cadastradas():
 # STREAMLIT INTERFACE - ADICIONAR FUNCIONALIDADES COM MENU DE ESCOLHA
 # ============================================================
 def iniciar_leitura():
+    iniciar_metricas()
     st.title("📷 Leitor de QR Code de Nota Fiscal (NFC-e)")
 
     # Criação do menu de escolha
@@ -104,57 +139,65 @@ def iniciar_leitura():
     if opcao == "Leitura ao Vivo (Câmera)":
         st.write("📸 A câmera será ativada automaticamente e o QR Code será lido assim que entrar no foco.")
         
+        from deteccao_qr import DetectorQR, LeitorCamera
+
         # Fonte da webcam
         fonte = 0  # Para usar a webcam
-        cap = cv2.VideoCapture(fonte)  # Inicia a captura da webcam
+        # Captura e decodificação rodam em threads próprias; a decodificação usa uma cópia
+        # reduzida em cinza e pula frames enquanto a cena não muda
+        leitor = LeitorCamera(fonte, DetectorQR()).iniciar()
 
         stframe = st.empty()  # Cria um espaço vazio para exibir o vídeo
-
-        # Loop de captura contínua
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                st.write("Erro ao capturar vídeo.")
-                break
-
-            # Converte a imagem para RGB (Streamlit espera essa cor)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Exibe a imagem da câmera no Streamlit com ajuste automático de largura
-            stframe.image(frame_rgb, channels="RGB", use_container_width=True)
-
-            # Tenta ler o QR Code
-            texto_qr = ler_qrcode(frame)
-            if texto_qr:
-                st.write(f"QR Code detectado: {texto_qr}")
-
-                # Extrair dados do QR Code
-                dados = extrair_dados(texto_qr)
-
-                if dados["chave_acesso"]:
-                    chave = dados["chave_acesso"]
-
-                    # Verifica se o cupom já foi salvo
-                    existe = supabase.table("notas_fiscais").select("chave_acesso").eq("chave_acesso", chave).execute()
-
-                    if not existe.data:
-                        # Se a chave não existe, salva no Supabase
-                        salvar_supabase(url=dados["url_cupom"], chave=chave)
-                        st.write("✅ Cupom salvo com sucesso!")
-                        st.write(f"Chave de Acesso: {chave}")
-                        st.write(f"URL: {dados['url_cupom']}")
-                    else:
-                        st.write("⚠️ Cupom já lido!")
-                break  # Interrompe o loop após salvar a chave
-
-        cap.release()  # Libera a câmera após terminar
+        sequencia = 0
+
+        # Loop de exibição: mostra o frame mais recente e verifica se já há QR decodificado
+        try:
+            while True:
+                frame, nova_sequencia = leitor.aguardar_frame(sequencia)
+                if leitor.erro:
+                    st.write(leitor.erro)
+                    break
+
+                # Exibe a imagem da câmera (o Streamlit converte de BGR, sem cvtColor por frame)
+                if frame is not None and nova_sequencia != sequencia:
+                    stframe.image(frame, channels="BGR", use_container_width=True)
+                sequencia = nova_sequencia
+
+                # Verifica se a thread de decodificação achou um QR Code
+                texto_qr = leitor.resultado()
+                if texto_qr:
+                    st.write(f"QR Code detectado: {texto_qr}")
+
+                    # Extrair dados do QR Code
+                    dados = extrair_dados(texto_qr)
+
+                    if dados["chave_acesso"]:
+                        chave = dados["chave_acesso"]
+
+                        # Verifica se o cupom já foi salvo
+                        if not chave_ja_cadastrada(chave):
+                            # Se a chave não existe, salva no Supabase
+                            salvar_supabase(url=dados["url_cupom"], chave=chave)
+                            enviar_para_ingestao(texto_qr)
+                            st.write("✅ Cupom salvo com sucesso!")
+                            st.write(f"Chave de Acesso: {chave}")
+                            st.write(f"URL: {dados['url_cupom']}")
+                        else:
+                            st.write("⚠️ Cupom já lido!")
+                    break  # Interrompe o loop após salvar a chave
+        finally:
+            leitor.parar()  # Libera a câmera após terminar
+
+        estatisticas = leitor.detector.estatisticas()
+        st.caption(f"Decodificação: {estatisticas['latencia_media_ms']:.1f} ms em média "
+                   f"(p95 {estatisticas['latencia_p95_ms']:.1f} ms), "
+                   f"{estatisticas['decodificacoes']} de {estatisticas['frames']} frames decodificados.")
 
     elif opcao == "Fazer upload de QR Code":
         st.write("Faça o upload de uma imagem contendo um QR Code.")
         file = st.file_uploader("Selecione uma imagem de nota fiscal (JPG, PNG)...", type=["jpg", "jpeg", "png"])
 
         if file:
-            img = Image.open(file)
             texto_qr_imagem = ler_qrcode_imagem(file)
             if not texto_qr_imagem:
                 st.warning("⚠ Não foi possível decodificar o QR Code. Tente outra imagem.")
@@ -162,11 +205,11 @@ def iniciar_leitura():
                 dados = extrair_dados(texto_qr_imagem)
                 if dados["chave_acesso"]:
                     chave = dados["chave_acesso"]
-                    # Verifica se a chave já existe no Supabase
-                    existe = supabase.table("notas_fiscais").select("chave_acesso").eq("chave_acesso", chave).execute()
-                    if not existe.data:
+                    # Verifica se a chave já existe (cache local primeiro, Supabase se necessário)
+                    if not chave_ja_cadastrada(chave):
                         # Se a chave não existe, salva no Supabase
                         salvar_supabase(url=dados["url_cupom"], chave=chave)
+                        enviar_para_ingestao(texto_qr_imagem)
                         st.success(f"✅ Chave salva: {chave}")
                     else:
                         st.info(f"⚠ Chave já existente: {chave}")
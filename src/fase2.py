@@ -1,200 +1,226 @@
 import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from supabase import create_client
-from tabulate import tabulate
-from datetime import datetime
-import re
-import configparser
-
-# Crie um objeto ConfigParser
-config = configparser.ConfigParser()
-
-# Leia o arquivo de configuração
-config.read('config.ini')
-
-# Verifique se a seção 'SUPABASE' existe
-if 'SUPABASE' in config:
-    SUPABASE_URL = config['SUPABASE']['SUPABASE_URL']
-    SUPABASE_KEY = config['SUPABASE']['SUPABASE_KEY']
-else:
-    print("Erro: Seção 'SUPABASE' não encontrada no arquivo de configuração.")
-    exit(1)  # Encerra o programa se não encontrar a seção
-
-# Cria o cliente do Supabase com as variáveis carregadas
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-# ===============================================
-# CONFIGURAÇÃO DE LOGGING (sem logs no terminal)
-# ===============================================
-logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+import time
+from cliente import obter_config, obter_supabase
+from pool_drivers import PoolDrivers
+from paginacao import paginar
+from gravacao_lote import GravadorLote, montar_registros
+from fila_jobs import FilaJobs
+from agendador_hosts import AgendadorHosts, host_da_url
+from cache_paginas import CachePaginas
+from deteccao_anomalias import DetectorAnomalias, RegistroAnomalias
+from metricas import contar, cronometrar, iniciar_servidor, SnapshotPeriodico
+from extracao_nfce import (baixar_documento_danfe, extrair_dados_html, PortalSobrecarregado, XPATH_IFRAME, XPATH_EMISSAO, XPATH_LINHAS,
+                           XPATH_TOTAL, XPATH_FORMA_PAGAMENTO, PADRAO_EMISSAO)
 
-def obter_urls_nfce():
-    """Busca todas as URLs de NFC-e salvas no Supabase."""
-    try:
-        response = supabase.table("notas_fiscais").select("url").execute()
-        return [item["url"] for item in response.data]
-    except Exception as e:
-        logging.error(f"Erro ao obter URLs de NFC-e: {e}")
-        return []
+# Configuração lida uma vez por processo; o cliente do Supabase só é criado no primeiro uso
+config = obter_config()
+
+# Parâmetros do pool de drivers (seção opcional 'FASE2')
+NUM_DRIVERS = config.getint('FASE2', 'NUM_DRIVERS', fallback=4)
+PAGINAS_POR_DRIVER = config.getint('FASE2', 'PAGINAS_POR_DRIVER', fallback=50)
+TAMANHO_LOTE = config.getint('FASE2', 'TAMANHO_LOTE', fallback=50)
+INTERVALO_LOTE = config.getfloat('FASE2', 'INTERVALO_LOTE', fallback=5.0)
+ARQUIVO_FILA = config.get('FASE2', 'ARQUIVO_FILA', fallback='fila_nfce.db')
+MAX_TENTATIVAS = config.getint('FASE2', 'MAX_TENTATIVAS', fallback=5)
+ESPERA_BASE = config.getfloat('FASE2', 'ESPERA_BASE', fallback=10.0)
+# Tabela de cada nota no terminal (formatar é uma fração mensurável do laço)
+EXIBIR_TABELAS = config.getboolean('FASE2', 'EXIBIR_TABELAS', fallback=True)
+
+# Ritmo por portal da SEFAZ (ver agendador_hosts.py): consultas/s e rajada do balde de tokens,
+# consultas simultâneas máximas, latência acima da qual o host é tratado como lento e disjuntor
+TAXA_POR_HOST = config.getfloat('FASE2', 'TAXA_POR_HOST', fallback=5.0)
+RAJADA_POR_HOST = config.getint('FASE2', 'RAJADA_POR_HOST', fallback=10)
+LIMITE_POR_HOST = config.getint('FASE2', 'LIMITE_POR_HOST', fallback=NUM_DRIVERS)
+LATENCIA_ALVO = config.getfloat('FASE2', 'LATENCIA_ALVO', fallback=10.0)
+LIMIAR_CIRCUITO = config.getint('FASE2', 'LIMIAR_CIRCUITO', fallback=5)
+ESPERA_CIRCUITO = config.getfloat('FASE2', 'ESPERA_CIRCUITO', fallback=30.0)
+
+# Cache das páginas consultadas, para reextrair sem raspar de novo (ver cache_paginas.py; vazio desativa)
+DIRETORIO_CACHE_PAGINAS = config.get('FASE2', 'CACHE_PAGINAS', fallback='cache_paginas')
+LIMITE_CACHE_PAGINAS_MB = config.getint('FASE2', 'CACHE_PAGINAS_MB', fallback=512)
+
+# Anomalias das notas, uma por linha em JSON (vazio: só no log de erros)
+ARQUIVO_ANOMALIAS = config.get('FASE2', 'ARQUIVO_ANOMALIAS', fallback='anomalias.jsonl')
 
-def obter_chave_acesso(url):
-    """Busca a chave de acesso da URL existente na tabela 'notas_fiscais'."""
+# Métricas (seção opcional 'METRICAS'): endpoint /metrics e/ou snapshot JSON periódico
+PORTA_METRICAS = config.getint('METRICAS', 'PORTA', fallback=0)
+ENDERECO_METRICAS = config.get('METRICAS', 'ENDERECO', fallback='127.0.0.1')
+ARQUIVO_METRICAS = config.get('METRICAS', 'ARQUIVO_SNAPSHOT', fallback='')
+INTERVALO_METRICAS = config.getfloat('METRICAS', 'INTERVALO_SNAPSHOT', fallback=15.0)
+
+# Estado da execução, criado em main()
+fila = None
+gravador = None
+detector = None
+registro_anomalias = None
+agendador = None
+cache_paginas = None
+
+def planejar_pendentes():
+    """
+    Monta, em consultas paginadas, o mapa {chave_acesso: url} das notas de 'notas_fiscais'
+    que ainda não têm linha em 'notas_detalhes'. Retorna None se a leitura falhar (um mapa
+    incompleto faria a fila concluir jobs que ainda estão pendentes).
+    """
     try:
-        response = supabase.table("notas_fiscais").select("chave_acesso").eq("url", url).execute()
-        if response.data:
-            return response.data[0]["chave_acesso"]
-        else:
-            logging.warning(f"Chave de acesso não encontrada para a URL: {url}")
-            return None
+        processadas = set()
+        supabase = obter_supabase()
+        for pagina in paginar(supabase, "notas_detalhes", "chave_acesso"):
+            processadas.update(item["chave_acesso"] for item in pagina)
+
+        pendentes = {}
+        for pagina in paginar(supabase, "notas_fiscais", "chave_acesso,url"):
+            for item in pagina:
+                if item["chave_acesso"] and item["chave_acesso"] not in processadas:
+                    pendentes[item["chave_acesso"]] = item["url"]
+        return pendentes
     except Exception as e:
-        logging.error(f"Erro ao obter chave de acesso para a URL {url}: {e}")
+        logging.error(f"Erro ao planejar as NFC-e pendentes: {e}")
         return None
 
-def verificar_dados_existentes(chave_acesso):
-    """Verifica se os dados para a chave de acesso já existem na tabela 'notas_detalhes'."""
+def salvar_nfc_e_no_supabase(dados, chave_acesso):
+    """Enfileira os dados da NFC-e no gravador em lote do Supabase. Retorna True se enfileirou."""
     try:
-        response = supabase.table("notas_detalhes").select("chave_acesso").eq("chave_acesso", chave_acesso).execute()
-        return len(response.data) > 0
+        detalhe, itens = montar_registros(dados, chave_acesso)
+        anomalias = detector.analisar(detalhe, itens)
+        if registro_anomalias:
+            registro_anomalias.registrar(anomalias)
+        else:
+            for anomalia in anomalias:
+                logging.error(f"Anomalia ({anomalia.tipo}) na NFC-e {chave_acesso}: {anomalia.descricao}")
+        gravador.adicionar(detalhe, itens)
+        return True
     except Exception as e:
-        logging.error(f"Erro ao verificar dados existentes para a chave de acesso {chave_acesso}: {e}")
+        logging.error(f"Erro ao salvar dados no Supabase: {e}")
         return False
 
-def salvar_nfc_e_no_supabase(dados):
-    """Salva os dados da NFC-e no Supabase."""
-    chave_acesso = obter_chave_acesso(dados["url"])
-    if not chave_acesso:
-        logging.error("Chave de acesso não encontrada. Não foi possível salvar os dados.")
+def guardar_pagina(chave_acesso, url, html):
+    """Guarda o HTML do iframe no cache de páginas (se ativo); falhas do cache não param a consulta."""
+    if cache_paginas is None or not chave_acesso:
         return
-
-    if verificar_dados_existentes(chave_acesso):
-        logging.info(f"Dados já existentes para a chave de acesso {chave_acesso}. Pulando...")
-        return
-
     try:
-        dados["total_venda"] = float(dados["total_venda"].replace(",", ".")) if dados["total_venda"] else None
-        if dados["data_hora_venda"]:
-            dados["data_hora_venda"] = datetime.strptime(dados["data_hora_venda"], "%d/%m/%Y %H:%M:%S").isoformat()
-
-        supabase.table("notas_detalhes").upsert([{
-            "chave_acesso": chave_acesso,
-            "data_hora_venda": dados["data_hora_venda"],
-            "forma_pagamento": dados["forma_pagamento"],
-            "total_venda": dados["total_venda"]
-        }]).execute()
-
-        for produto in dados["produtos"]:
-            produto["quantidade"] = float(produto["quantidade"].replace("Qtde.:", "").replace(",", ".")) if produto["quantidade"] else None
-            produto["preco_unitario"] = float(produto["preco_unitario"].replace("Vl. Unit.:", "").replace(",", ".")) if produto["preco_unitario"] else None
-            produto["valor_total"] = float(produto["valor_total"].replace(",", ".").strip()) if produto["valor_total"] else None
-
-            supabase.table("itens_nota").upsert([{
-                "chave_acesso": chave_acesso,
-                "produto": produto["produto"],
-                "quantidade": produto["quantidade"],
-                "preco_unitario": produto["preco_unitario"],
-                "total_item": produto["valor_total"]
-            }]).execute()
-
-        logging.info("Dados salvos no Supabase com sucesso!")
+        cache_paginas.guardar(chave_acesso, url, html)
     except Exception as e:
-        logging.error(f"Erro ao salvar dados no Supabase: {e}")
+        logging.error(f"Erro ao guardar a página da NFC-e {chave_acesso} no cache: {e}")
 
 # ===============================================
-# INICIAR DRIVER
+# EXTRAÇÃO VIA SELENIUM (alternativa ao caminho HTTP)
 # ===============================================
-def iniciar_driver():
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
-    options.add_argument("--ignore-certificate-errors")
-    options.add_argument("--allow-insecure-localhost")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+def extrair_nfce_selenium(url, reciclavel, chave_acesso=None):
+    """
+    Extrai os dados abrindo a página no driver do worker (uma única tentativa). O HTML do
+    iframe só vai para o cache depois que todos os campos apareceram (a página é montada por
+    JavaScript); se um XPath falhar, ele é guardado após o documento terminar de carregar.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    no_iframe = False
+    try:
+        logging.info(f"Acessando NFC-e: {url}")
+        driver = reciclavel.obter()
+        driver.switch_to.default_content()  # driver reaproveitado pode estar dentro do iframe anterior
+        wait = WebDriverWait(driver, 15)
+        with cronometrar("fiscalis_pagina_carregamento_segundos", caminho="selenium"):
+            driver.get(url)
+
+        with cronometrar("fiscalis_iframe_espera_segundos", caminho="selenium"):
+            iframe_element = wait.until(EC.presence_of_element_located((By.XPATH, XPATH_IFRAME)))
+        driver.switch_to.frame(iframe_element)
+        no_iframe = True
+
+        dados = {   
+            "url": url,
+            "produtos": []
+        }
+
+        # Extrair Data/Hora da Venda
+        emissao = wait.until(EC.presence_of_element_located((By.XPATH, XPATH_EMISSAO))).text
+        match = PADRAO_EMISSAO.search(emissao)
+        if match:
+            dados["data_hora_venda"] = match.group(1)
+        else:
+            dados["data_hora_venda"] = None
+
+        # Extrair Produtos
+        produtos = []
+        linhas = wait.until(EC.presence_of_all_elements_located((By.XPATH, XPATH_LINHAS)))
+        for linha in linhas:
+            nome = linha.find_element(By.XPATH, './/td[1]/span[1]').text
+            quantidade = linha.find_element(By.XPATH, './/td[1]/span[3]').text
+            preco_unitario = linha.find_element(By.XPATH, './/td[1]/span[5]').text
+            total_item = linha.find_element(By.XPATH, './/td[2]/span').text
+
+            produtos.append({
+                "produto": nome,
+                "quantidade": quantidade,
+                "preco_unitario": preco_unitario,
+                "valor_total": total_item
+            })
+        dados["produtos"] = produtos
+
+        # Extrair Total e Forma de Pagamento
+        total = wait.until(EC.presence_of_element_located((By.XPATH, XPATH_TOTAL))).text
+        dados["total_venda"] = total
+
+        forma_pg = wait.until(EC.presence_of_element_located((By.XPATH, XPATH_FORMA_PAGAMENTO))).text
+        dados["forma_pagamento"] = forma_pg
+
+        guardar_pagina(chave_acesso, url, driver.page_source)
+        reciclavel.pagina_concluida()
+        return dados
+    except Exception:
+        if no_iframe:
+            # XPath quebrado ou campo ausente: guarda o documento já carregado para reextrair depois
+            try:
+                WebDriverWait(driver, 5).until(lambda d: d.execute_script("return document.readyState") == "complete")
+                guardar_pagina(chave_acesso, url, driver.page_source)
+            except Exception as e:
+                logging.error(f"Página da NFC-e {url} não guardada após a falha: {e}")
+        # Descarta o driver (pode ter travado); a próxima tentativa usa um novo
+        reciclavel.encerrar()
+        raise
 
 # ===============================================
-# CONSULTA DE NFC-e COM REINTENTOS EM CASO DE ERRO
+# CONSULTA DE NFC-e (os reintentos ficam a cargo da fila de jobs)
 # ===============================================
-def consultar_nfce(url, tentativas=3):
-    tentativa = 1
-    chave_acesso = obter_chave_acesso(url)
-    
-    # Verificar se os dados já foram salvos no Supabase
-    if chave_acesso and verificar_dados_existentes(chave_acesso):
-        print(f"\nDados já lidos para a URL {url}.\n")
-        return None
-
-    while tentativa <= tentativas:
+def obter_dados_nfce(url, reciclavel, chave_acesso):
+    """
+    Só a consulta ao portal: baixa (ou abre no navegador) a NFC-e e extrai os dados.
+    A chave vem do planejamento da fila, então a nota já é sabidamente pendente.
+    """
+    # Caminho rápido: HTTP + lxml; o Selenium só entra se o parse estático falhar.
+    # A página vai para o cache antes do parse, então mesmo um XPath quebrado pode ser reextraído depois
+    try:
+        html = baixar_documento_danfe(url)
+        guardar_pagina(chave_acesso, url, html)
+        dados = extrair_dados_html(html, url)
+        contar("fiscalis_consultas_total", caminho="http")
+    except PortalSobrecarregado:
+        # O portal está limitando: abrir o navegador só pioraria
+        raise
+    except Exception as e:
+        logging.info(f"Caminho HTTP indisponível para {url} ({e}). Usando Selenium.")
         try:
-            logging.info(f"Acessando NFC-e: {url}")
-            driver = iniciar_driver()
-            wait = WebDriverWait(driver, 15)
-            driver.get(url)
+            dados = extrair_nfce_selenium(url, reciclavel, chave_acesso)
+        except Exception:
+            contar("fiscalis_consultas_falhas_total")
+            raise
+        contar("fiscalis_consultas_total", caminho="selenium")
+    return dados
 
-            iframe_element = wait.until(EC.presence_of_element_located((By.XPATH, '//iframe[contains(@src, "danfeNFCe")]')))
-            driver.switch_to.frame(iframe_element)
-
-            dados = {   
-                "url": url,
-                "produtos": []
-            }
-
-            # Extrair Data/Hora da Venda
-            emissao = wait.until(EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div[4]/div/div[2]/div[2]/div[1]/div/ul/li'))).text
-            match = re.search(r"Emissão:\s*(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})", emissao)
-            if match:
-                dados["data_hora_venda"] = match.group(1)
-            else:
-                dados["data_hora_venda"] = None
-
-            # Extrair Produtos
-            produtos = []
-            linhas = wait.until(EC.presence_of_all_elements_located((By.XPATH, '/html/body/div[1]/div[4]/div/div[2]/div[1]/table/tbody/tr')))
-            for linha in linhas:
-                nome = linha.find_element(By.XPATH, './/td[1]/span[1]').text
-                quantidade = linha.find_element(By.XPATH, './/td[1]/span[3]').text
-                preco_unitario = linha.find_element(By.XPATH, './/td[1]/span[5]').text
-                total_item = linha.find_element(By.XPATH, './/td[2]/span').text
-
-                produtos.append({
-                    "produto": nome,
-                    "quantidade": quantidade,
-                    "preco_unitario": preco_unitario,
-                    "valor_total": total_item
-                })
-            dados["produtos"] = produtos
-
-            # Extrair Total e Forma de Pagamento
-            total = wait.until(EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div[4]/div/div[2]/div[1]/div[3]/div[2]/span'))).text
-            dados["total_venda"] = total
-
-            forma_pg = wait.until(EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/div[4]/div/div[2]/div[1]/div[3]/div[4]/label'))).text
-            dados["forma_pagamento"] = forma_pg
-
-            driver.quit()
-            salvar_nfc_e_no_supabase(dados)
-            print_dados(dados)
-            return dados  # Retornar dados após salvar com sucesso
-        except Exception as e:
-            logging.error(f"Erro na tentativa {tentativa} ao consultar a NFC-e: {e}")
-            tentativa += 1
-            if tentativa > tentativas:
-                logging.error(f"Falha ao tentar acessar {url} após {tentativas} tentativas.")
-                driver.quit()
-                return None  # Retorna None após várias falhas
+def registrar_nfce(dados, url, chave_acesso):
+    """Enfileira a gravação dos dados extraídos (e os exibe, se configurado)."""
+    if not salvar_nfc_e_no_supabase(dados, chave_acesso):
+        raise RuntimeError(f"Não foi possível preparar a gravação da NFC-e {url}.")
+    if EXIBIR_TABELAS:
+        print_dados(dados)
 
 # ===============================================
 # EXIBIÇÃO DOS DADOS EXTRAÍDOS
 # ===============================================
 def print_dados(dados):
+    from tabulate import tabulate
     print("\n" + "="*40)
     print(f"Data e Hora da Venda: {dados['data_hora_venda']}")
     if dados["produtos"]:
@@ -211,7 +237,93 @@ def print_dados(dados):
     print("\nDados salvos no Supabase")
     print("="*40 + "\n")
 
-# EXECUTAR
-urls = obter_urls_nfce()
-for url in urls:
-    consultar_nfce(url)
\ No newline at end of file
+# ===============================================
+# JOBS DA FILA
+# ===============================================
+def processar_job(job, reciclavel):
+    """
+    Executa um job (chave_acesso, url); ele só é concluído quando o lote da nota for gravado.
+    A vaga do host foi ocupada pela fila e é devolvida aqui, com o resultado e a duração só
+    da consulta ao portal (a gravação e a detecção de anomalias ficam de fora da medida).
+    """
+    chave_acesso, url = job
+    host = host_da_url(url)
+    inicio = time.monotonic()
+    try:
+        dados = obter_dados_nfce(url, reciclavel, chave_acesso)
+    except PortalSobrecarregado as e:
+        # Limitação do portal não conta como tentativa do job
+        logging.warning(f"Portal sobrecarregado ao consultar a NFC-e {url}: {e}")
+        agendador.liberar(host, False, time.monotonic() - inicio, espera=e.espera or ESPERA_CIRCUITO)
+        fila.devolver(chave_acesso, e.espera or ESPERA_CIRCUITO)
+        return
+    except Exception as e:
+        logging.error(f"Erro ao consultar a NFC-e {url}: {e}")
+        agendador.liberar(host, False, time.monotonic() - inicio)
+        fila.falhar(chave_acesso, e)
+        return
+    agendador.liberar(host, True, time.monotonic() - inicio)
+
+    try:
+        registrar_nfce(dados, url, chave_acesso)
+    except Exception as e:
+        logging.error(f"Erro ao registrar a NFC-e {url}: {e}")
+        fila.falhar(chave_acesso, e)
+
+def concluir_jobs(chaves):
+    for chave in chaves:
+        fila.concluir(chave)
+
+def falhar_jobs(chaves, erro):
+    for chave in chaves:
+        fila.falhar(chave, erro)
+
+# ===============================================
+# EXECUÇÃO
+# ===============================================
+def main():
+    global fila, gravador, detector, registro_anomalias, agendador, cache_paginas
+
+    # Configuração de logging (sem logs no terminal)
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if PORTA_METRICAS:
+        iniciar_servidor(PORTA_METRICAS, endereco=ENDERECO_METRICAS)
+    snapshot_metricas = SnapshotPeriodico(ARQUIVO_METRICAS, INTERVALO_METRICAS) if ARQUIVO_METRICAS else None
+
+    fila = FilaJobs(ARQUIVO_FILA, MAX_TENTATIVAS, ESPERA_BASE)
+    # Gravações no Supabase são agrupadas em upserts de várias linhas
+    gravador = GravadorLote(obter_supabase(), TAMANHO_LOTE, INTERVALO_LOTE, ao_gravar=concluir_jobs, ao_falhar=falhar_jobs)
+    # Anomalias são detectadas enquanto as notas são gravadas e guardadas em ARQUIVO_ANOMALIAS
+    detector = DetectorAnomalias()
+    if ARQUIVO_ANOMALIAS:
+        registro_anomalias = RegistroAnomalias(ARQUIVO_ANOMALIAS)
+    # Consultas distribuídas por portal: ritmo adaptativo e disjuntor por host
+    agendador = AgendadorHosts(limite_maximo=LIMITE_POR_HOST, taxa=TAXA_POR_HOST, rajada=RAJADA_POR_HOST,
+                               latencia_alvo=LATENCIA_ALVO, limiar_falhas=LIMIAR_CIRCUITO,
+                               espera_circuito=ESPERA_CIRCUITO)
+
+    if DIRETORIO_CACHE_PAGINAS:
+        cache_paginas = CachePaginas(DIRETORIO_CACHE_PAGINAS, LIMITE_CACHE_PAGINAS_MB * 1024 * 1024)
+
+    pendentes = planejar_pendentes()
+    if pendentes is not None:
+        fila.enfileirar(pendentes)
+    PoolDrivers(NUM_DRIVERS, PAGINAS_POR_DRIVER).processar(fila.iterar(agendador=agendador), processar_job)
+    gravador.fechar()
+    print(f"Fila de NFC-e: {fila.contagem()}")
+    for host, resumo in agendador.resumo().items():
+        print(f"Portal {host}: {resumo}")
+    if detector.contagem:
+        print(f"Anomalias encontradas: {dict(detector.contagem)}" +
+              (f" (detalhes em {ARQUIVO_ANOMALIAS})" if registro_anomalias else ""))
+    if registro_anomalias:
+        registro_anomalias.fechar()
+    fila.fechar()
+    if cache_paginas:
+        cache_paginas.fechar()
+    if snapshot_metricas:
+        snapshot_metricas.parar()
+
+if __name__ == "__main__":
+    main()
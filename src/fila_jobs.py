@@ -0,0 +1,208 @@
+import logging
+import sqlite3
+import threading
+import time
+from agendador_hosts import host_da_url
+from metricas import contar
+
+# ===============================================
+# ESTADOS DOS JOBS
+# ===============================================
+PENDENTE = "pendente"
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+
+# ===============================================
+# FILA PERSISTENTE DE JOBS (SQLite)
+# ===============================================
+class FilaJobs:
+    """
+    Fila local e durável de consultas de NFC-e, uma linha por chave de acesso.
+    Guarda estado, número de tentativas e o horário da próxima tentativa, de modo que
+    um reinício continue de onde parou sem repetir notas já concluídas. O host da URL
+    fica numa coluna própria para que a reserva possa pular portais bloqueados.
+    """
+
+    def __init__(self, caminho="fila_nfce.db", max_tentativas=5, espera_base=10.0, espera_maxima=600.0):
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                chave_acesso TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL DEFAULT 0,
+                ultimo_erro TEXT,
+                atualizado_em REAL,
+                host TEXT
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_jobs_estado ON jobs (estado, proxima_tentativa)")
+        self._migrar_host()
+        self.recuperar_interrompidos()
+
+    def _migrar_host(self):
+        """Filas criadas antes da coluna 'host': adiciona a coluna e preenche a partir da URL."""
+        colunas = [linha[1] for linha in self._conexao.execute("PRAGMA table_info(jobs)")]
+        if "host" not in colunas:
+            self._conexao.execute("ALTER TABLE jobs ADD COLUMN host TEXT")
+        sem_host = self._conexao.execute("SELECT chave_acesso, url FROM jobs WHERE host IS NULL").fetchall()
+        if sem_host:
+            self._conexao.executemany("UPDATE jobs SET host = ? WHERE chave_acesso = ?",
+                                      [(host_da_url(url), chave) for chave, url in sem_host])
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
+
+    def enfileirar(self, pendentes):
+        """
+        Sincroniza a fila com o planejamento {chave_acesso: url} (o conjunto completo de notas
+        ainda sem detalhe). Chaves novas entram como pendentes; jobs desistidos que continuam
+        no planejamento voltam a pendentes com as tentativas zeradas; jobs pendentes ou
+        desistidos que saíram do planejamento (já detalhados por outra execução) são concluídos.
+        Retorna quantos jobs ficaram pendentes por causa desta chamada (novos + reativados).
+        """
+        agora = time.time()
+        with self._trava:
+            self._conexao.execute("CREATE TEMP TABLE IF NOT EXISTS planejadas (chave_acesso TEXT PRIMARY KEY)")
+            self._conexao.execute("DELETE FROM planejadas")
+            self._conexao.execute("BEGIN")
+            try:
+                self._conexao.executemany("INSERT OR IGNORE INTO planejadas (chave_acesso) VALUES (?)",
+                                          [(chave,) for chave in pendentes])
+                antes = self._conexao.total_changes
+                self._conexao.executemany(
+                    "INSERT OR IGNORE INTO jobs (chave_acesso, url, estado, atualizado_em, host) VALUES (?, ?, ?, ?, ?)",
+                    [(chave, url, PENDENTE, agora, host_da_url(url)) for chave, url in pendentes.items()]
+                )
+                novos = self._conexao.total_changes - antes
+                reativados = self._conexao.execute(
+                    "UPDATE jobs SET estado = ?, tentativas = 0, proxima_tentativa = 0, atualizado_em = ? "
+                    "WHERE estado = ? AND chave_acesso IN (SELECT chave_acesso FROM planejadas)",
+                    (PENDENTE, agora, FALHOU)
+                ).rowcount
+                encerrados = self._conexao.execute(
+                    "UPDATE jobs SET estado = ?, ultimo_erro = NULL, atualizado_em = ? "
+                    "WHERE estado IN (?, ?) AND chave_acesso NOT IN (SELECT chave_acesso FROM planejadas)",
+                    (CONCLUIDO, agora, PENDENTE, FALHOU)
+                ).rowcount
+                self._conexao.execute("COMMIT")
+            except Exception:
+                self._conexao.execute("ROLLBACK")
+                raise
+            finally:
+                self._conexao.execute("DELETE FROM planejadas")
+        if reativados or encerrados:
+            logging.info(f"Fila: {novos} jobs novos, {reativados} desistidos reativados, "
+                         f"{encerrados} já detalhados fora da fila.")
+        return novos + reativados
+
+    def recuperar_interrompidos(self):
+        """Devolve à fila os jobs que estavam em andamento quando o processo parou."""
+        with self._trava:
+            self._conexao.execute("UPDATE jobs SET estado = ? WHERE estado = ?", (PENDENTE, EM_ANDAMENTO))
+
+    def reservar(self, hosts_excluidos=()):
+        """
+        Marca como em andamento e retorna (chave_acesso, url) do próximo job vencido, ou None.
+        Jobs cujo host está em 'hosts_excluidos' ficam na fila.
+        """
+        agora = time.time()
+        filtro = f" AND host NOT IN ({','.join('?' * len(hosts_excluidos))})" if hosts_excluidos else ""
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT chave_acesso, url FROM jobs WHERE estado = ? AND proxima_tentativa <= ?" + filtro +
+                " ORDER BY proxima_tentativa LIMIT 1",
+                (PENDENTE, agora, *hosts_excluidos)
+            ).fetchone()
+            if linha:
+                self._conexao.execute(
+                    "UPDATE jobs SET estado = ?, atualizado_em = ? WHERE chave_acesso = ?",
+                    (EM_ANDAMENTO, agora, linha[0])
+                )
+            return linha
+
+    def concluir(self, chave_acesso):
+        with self._trava:
+            self._conexao.execute(
+                "UPDATE jobs SET estado = ?, ultimo_erro = NULL, atualizado_em = ? WHERE chave_acesso = ?",
+                (CONCLUIDO, time.time(), chave_acesso)
+            )
+
+    def devolver(self, chave_acesso, espera=0.0):
+        """Volta o job para a fila sem contar tentativa (ex.: portal pediu para esperar)."""
+        agora = time.time()
+        with self._trava:
+            self._conexao.execute(
+                "UPDATE jobs SET estado = ?, proxima_tentativa = ?, atualizado_em = ? WHERE chave_acesso = ?",
+                (PENDENTE, agora + espera, agora, chave_acesso)
+            )
+
+    def falhar(self, chave_acesso, erro):
+        """Registra a falha e agenda nova tentativa com espera exponencial (ou desiste no limite)."""
+        agora = time.time()
+        with self._trava:
+            linha = self._conexao.execute("SELECT tentativas FROM jobs WHERE chave_acesso = ?", (chave_acesso,)).fetchone()
+            if not linha:
+                return
+            tentativas = linha[0] + 1
+            if tentativas >= self.max_tentativas:
+                estado, proxima = FALHOU, agora
+                logging.error(f"Job {chave_acesso} desistido após {tentativas} tentativas: {erro}")
+                contar("fiscalis_jobs_desistidos_total")
+            else:
+                estado = PENDENTE
+                contar("fiscalis_jobs_reagendados_total")
+                proxima = agora + min(self.espera_maxima, self.espera_base * 2 ** (tentativas - 1))
+            self._conexao.execute(
+                "UPDATE jobs SET estado = ?, tentativas = ?, proxima_tentativa = ?, ultimo_erro = ?, atualizado_em = ? "
+                "WHERE chave_acesso = ?",
+                (estado, tentativas, proxima, str(erro), agora, chave_acesso)
+            )
+
+    def contagem(self):
+        """Retorna {estado: quantidade}."""
+        with self._trava:
+            return dict(self._conexao.execute("SELECT estado, COUNT(*) FROM jobs GROUP BY estado").fetchall())
+
+    def _proxima_pendente(self, hosts_excluidos=()):
+        filtro = f" AND host NOT IN ({','.join('?' * len(hosts_excluidos))})" if hosts_excluidos else ""
+        with self._trava:
+            return self._conexao.execute(
+                "SELECT MIN(proxima_tentativa) FROM jobs WHERE estado = ?" + filtro, (PENDENTE, *hosts_excluidos)
+            ).fetchone()[0]
+
+    def iterar(self, intervalo_verificacao=1.0, agendador=None):
+        """
+        Gera os jobs à medida que vencem. Termina quando não há nada pendente
+        nem em andamento (jobs em andamento ainda podem falhar e voltar à fila).
+
+        Com um AgendadorHosts, só entrega jobs de hosts liberados e já ocupa a vaga do
+        host (quem consome o job chama agendador.liberar ao terminar). Jobs de hosts
+        suspensos não seguram o fim da iteração: ficam pendentes para a próxima execução.
+        """
+        while True:
+            job = self.reservar(agendador.bloqueados() if agendador else ())
+            if job:
+                if agendador is None or agendador.adquirir(host_da_url(job[1])):
+                    yield job
+                else:
+                    self.devolver(job[0])
+                continue
+
+            proxima = self._proxima_pendente(agendador.suspensos() if agendador else ())
+            if proxima is None and not self.contagem().get(EM_ANDAMENTO):
+                return
+            espera = intervalo_verificacao if proxima is None else proxima - time.time()
+            if agendador and espera <= 0:
+                # Há jobs vencidos, mas todos de hosts bloqueados
+                agendador.aguardar(intervalo_verificacao)
+            else:
+                time.sleep(max(0.05, min(espera, intervalo_verificacao)))
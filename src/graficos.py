@@ -0,0 +1,80 @@
+"""
+Gráficos do dashboard a partir das séries agregadas (ver agregacao.py).
+
+renderizar_png desenha os quatro gráficos numa única figura (API orientada a objetos, sem
+o estado global do pyplot, então nenhuma figura fica aberta entre execuções) e guarda o
+PNG pelo hash das séries: se os dados não mudaram, a reexecução do Streamlit não desenha nada.
+series_nativas devolve as mesmas séries prontas para st.bar_chart, sem Matplotlib.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+# (granularidade, título, cor) na ordem em que os gráficos aparecem
+GRAFICOS = [
+    ("dia", "Total de Vendas por Dia", "skyblue"),
+    ("semana", "Total de Vendas por Semana", "lightgreen"),
+    ("mes", "Total de Vendas por Mês", "salmon"),
+    ("forma_pagamento", "Comparativo de Vendas por Forma de Pagamento", "purple"),
+]
+
+MAX_IMAGENS = 16  # PNGs guardados (LRU)
+MAX_ROTULOS = 40  # rótulos no eixo x de cada gráfico (acima disso, um a cada n barras)
+
+_imagens = OrderedDict()
+_trava = threading.Lock()
+
+def chave_series(series):
+    """Hash do conteúdo que aparece nos gráficos (índices e totais de cada granularidade)."""
+    resumo = hashlib.blake2b(digest_size=16)
+    for granularidade, _, _ in GRAFICOS:
+        total = series[granularidade]["total"]
+        resumo.update(granularidade.encode("utf-8"))
+        resumo.update(repr(list(total.index)).encode("utf-8"))
+        resumo.update(total.to_numpy(dtype="float64").tobytes())
+    return resumo.hexdigest()
+
+def _desenhar(series, largura, altura, dpi):
+    from matplotlib.figure import Figure
+
+    figura = Figure(figsize=(largura, altura), dpi=dpi, layout="constrained")
+    eixos = figura.subplots(2, 2)
+    for eixo, (granularidade, titulo, cor) in zip(eixos.flat, GRAFICOS):
+        total = series[granularidade]["total"]
+        eixo.bar(range(len(total)), total.to_numpy(), color=cor)
+        passo = max(1, -(-len(total) // MAX_ROTULOS))
+        posicoes = range(0, len(total), passo)
+        eixo.set_xticks(list(posicoes), [str(total.index[i]) for i in posicoes], rotation=90,
+                        fontsize=7 if len(posicoes) > 20 else 9)
+        eixo.set_title(titulo)
+        eixo.set_ylabel("Vendas (R$)")
+
+    saida = io.BytesIO()
+    figura.savefig(saida, format="png")
+    figura.clear()
+    return saida.getvalue()
+
+def renderizar_png(series, largura=16, altura=11, dpi=100):
+    """PNG com os quatro gráficos; reaproveita a imagem se as séries já foram desenhadas."""
+    chave = (chave_series(series), largura, altura, dpi)
+    with _trava:
+        if chave in _imagens:
+            _imagens.move_to_end(chave)
+            return _imagens[chave]
+
+    imagem = _desenhar(series, largura, altura, dpi)
+    with _trava:
+        _imagens[chave] = imagem
+        if len(_imagens) > MAX_IMAGENS:
+            _imagens.popitem(last=False)
+    return imagem
+
+def series_nativas(series):
+    """[(título, Series de totais)] para os gráficos nativos do Streamlit (st.bar_chart)."""
+    graficos = []
+    for granularidade, titulo, _ in GRAFICOS:
+        total = series[granularidade]["total"].copy()
+        total.index = total.index.map(str)
+        graficos.append((titulo, total))
+    return graficos
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from normalizacao import normalizar_lote
+from metricas import contar, cronometrar
+
+# ===============================================
+# CONVERSÃO DOS DADOS RASPADOS EM LINHAS DAS TABELAS
+# ===============================================
+def montar_registros(dados, chave_acesso):
+    """Converte 'dados' na linha de 'notas_detalhes' e nas linhas de 'itens_nota' (sem alterar 'dados')."""
+    detalhes, itens, rejeicoes = normalizar_lote([(dados, chave_acesso)])
+    for rejeicao in rejeicoes:
+        logging.error(f"Campo '{rejeicao.campo}' inválido na NFC-e {chave_acesso}: {rejeicao.valor!r}")
+    return detalhes[0], itens
+
+# ===============================================
+# GRAVADOR EM LOTE (write-behind)
+# ===============================================
+class GravadorLote:
+    """
+    Acumula notas e itens em memória e grava com upserts de várias linhas.
+    O lote é descarregado ao atingir 'tamanho_lote' notas ou após 'intervalo' segundos.
+    'ao_gravar(chaves)' e 'ao_falhar(chaves, erro)' são avisados do destino de cada lote.
+
+    'itens_nota' não tem chave única, então o upsert dos itens só acrescenta linhas. Com
+    'substituir_itens', os itens das notas do lote são trocados pelos novos na função
+    'substituir_itens_nota' (sql/substituir_itens_nota.sql), numa única transação: uma falha
+    não deixa a nota sem itens. Serve para regravar notas que já existem, como na reextração
+    do cache de páginas.
+    """
+
+    def __init__(self, cliente, tamanho_lote=50, intervalo=5.0, tentativas=3, espera_base=1.0,
+                 ao_gravar=None, ao_falhar=None, substituir_itens=False):
+        self.cliente = cliente
+        self.substituir_itens = substituir_itens
+        self.ao_gravar = ao_gravar
+        self.ao_falhar = ao_falhar
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo = intervalo
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+
+        self._detalhes = []
+        self._itens = []
+        self._inicio_lote = None
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._descarregar_periodicamente, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def adicionar(self, detalhe, itens):
+        """Enfileira uma nota (linha de 'notas_detalhes') e seus itens."""
+        with self._trava:
+            if not self._detalhes:
+                self._inicio_lote = time.monotonic()
+            self._detalhes.append(detalhe)
+            self._itens.extend(itens)
+            lote = self._retirar_lote() if len(self._detalhes) >= self.tamanho_lote else None
+        if lote:
+            self._gravar(*lote)
+
+    def descarregar(self):
+        """Grava imediatamente o que estiver pendente."""
+        with self._trava:
+            lote = self._retirar_lote()
+        if lote:
+            self._gravar(*lote)
+
+    def fechar(self):
+        """Para o descarregamento periódico e grava o restante."""
+        self._parar.set()
+        self._thread.join()
+        self.descarregar()
+
+    def _retirar_lote(self):
+        if not self._detalhes:
+            return None
+        lote = (self._detalhes, self._itens)
+        self._detalhes, self._itens = [], []
+        self._inicio_lote = None
+        return lote
+
+    def _descarregar_periodicamente(self):
+        while not self._parar.wait(min(self.intervalo, 1.0)):
+            with self._trava:
+                vencido = self._inicio_lote is not None and time.monotonic() - self._inicio_lote >= self.intervalo
+                lote = self._retirar_lote() if vencido else None
+            if lote:
+                self._gravar(*lote)
+
+    def _gravar(self, detalhes, itens):
+        """Grava o lote com reintentos; as notas vão antes dos itens, como no caminho linha a linha."""
+        chaves = [d["chave_acesso"] for d in detalhes]
+        detalhes_gravados = False
+        erro = None
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                if not detalhes_gravados:
+                    with cronometrar("fiscalis_supabase_round_trip_segundos", tabela="notas_detalhes", operacao="upsert"):
+                        self.cliente.table("notas_detalhes").upsert(detalhes).execute()
+                    detalhes_gravados = True
+                if self.substituir_itens:
+                    with cronometrar("fiscalis_supabase_round_trip_segundos", tabela="itens_nota", operacao="substituir"):
+                        self.cliente.rpc("substituir_itens_nota", {"chaves": chaves, "itens": itens}).execute()
+                elif itens:
+                    with cronometrar("fiscalis_supabase_round_trip_segundos", tabela="itens_nota", operacao="upsert"):
+                        self.cliente.table("itens_nota").upsert(itens).execute()
+                contar("fiscalis_notas_gravadas_total", len(detalhes))
+                logging.info(f"Lote gravado no Supabase: {len(detalhes)} notas, {len(itens)} itens.")
+                if self.ao_gravar:
+                    self.ao_gravar(chaves)
+                return True
+            except Exception as e:
+                erro = e
+                logging.error(f"Erro na tentativa {tentativa} ao gravar lote de {len(detalhes)} notas: {e}")
+                contar("fiscalis_supabase_falhas_total", operacao="upsert")
+                if tentativa < self.tentativas:
+                    contar("fiscalis_supabase_reintentos_total", operacao="upsert")
+                    time.sleep(self.espera_base * 2 ** (tentativa - 1))
+
+        logging.error(f"Lote descartado após {self.tentativas} tentativas. Chaves: {chaves}")
+        contar("fiscalis_lotes_descartados_total")
+        if self.ao_falhar:
+            self.ao_falhar(chaves, erro)
+        return False
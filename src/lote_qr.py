@@ -0,0 +1,113 @@
+"""
+Decodificação em lote de QR Codes de notas fiscais a partir de um diretório de imagens.
+
+Uso (a partir de src/):
+    python lote_qr.py pasta_de_fotos [--workers 8] [--saida resultados.jsonl] [--recursivo]
+
+Cada imagem gera uma linha JSON com todas as chaves de acesso válidas encontradas.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from pyzbar.pyzbar import decode
+from extracao_qr import chaves_validas
+
+EXTENSOES = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+# ============================================================
+# DECODIFICAÇÃO COM PRÉ-PROCESSAMENTO DE RESERVA
+# ============================================================
+def _textos(imagem):
+    return [qr.data.decode("utf-8", errors="replace") for qr in decode(imagem)]
+
+def _variantes(imagem):
+    """Pré-processamentos tentados, em ordem, quando a leitura direta falha."""
+    cinza = cv2.cvtColor(imagem, cv2.COLOR_RGB2GRAY) if imagem.ndim == 3 else imagem
+    yield cinza
+    yield cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    yield cv2.adaptiveThreshold(cinza, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+    # Fotos muito grandes confundem o zbar; fotos pequenas têm módulos de 1-2 pixels
+    maior_lado = max(cinza.shape[:2])
+    if maior_lado > 2000:
+        fator = 1600 / maior_lado
+        yield cv2.resize(cinza, None, fx=fator, fy=fator, interpolation=cv2.INTER_AREA)
+    else:
+        yield cv2.resize(cinza, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+def decodificar_imagem(imagem):
+    """Retorna todos os textos de QR da imagem (RGB ou cinza), tentando pré-processamentos se preciso."""
+    textos = _textos(imagem)
+    if not textos:
+        for variante in _variantes(imagem):
+            textos = _textos(variante)
+            if textos:
+                break
+    return list(dict.fromkeys(textos))
+
+def abrir_imagem(arquivo):
+    """Abre um caminho ou arquivo enviado, respeitando a orientação EXIF de fotos de celular."""
+    img = ImageOps.exif_transpose(Image.open(arquivo))
+    return np.array(img.convert("RGB"))
+
+def processar_arquivo(caminho):
+    """Decodifica um arquivo e devolve o registro que vira uma linha do JSONL."""
+    registro = {"arquivo": caminho, "chaves": [], "qrs": [], "erro": None}
+    try:
+        textos = decodificar_imagem(abrir_imagem(caminho))
+        registro["qrs"] = textos
+        registro["chaves"] = list(dict.fromkeys(c for t in textos for c in chaves_validas(t)))
+    except Exception as e:
+        registro["erro"] = str(e)
+    return registro
+
+# ============================================================
+# PROCESSAMENTO DO DIRETÓRIO
+# ============================================================
+def listar_imagens(diretorio, recursivo=False):
+    if not recursivo:
+        nomes = sorted(os.listdir(diretorio))
+        return [os.path.join(diretorio, n) for n in nomes if n.lower().endswith(EXTENSOES)]
+    caminhos = []
+    for raiz, _, nomes in os.walk(diretorio):
+        caminhos.extend(os.path.join(raiz, n) for n in sorted(nomes) if n.lower().endswith(EXTENSOES))
+    return caminhos
+
+def processar_diretorio(caminhos, workers=None, chunksize=4):
+    """Gera os registros à medida que os processos terminam (ordem não garantida)."""
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(processar_arquivo, caminhos, chunksize)
+
+def main():
+    parser = argparse.ArgumentParser(description="Decodifica em lote QR Codes de NFC-e em um diretório.")
+    parser.add_argument("diretorio")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--saida", help="arquivo JSONL de saída (padrão: saída padrão)")
+    parser.add_argument("--recursivo", action="store_true")
+    args = parser.parse_args()
+
+    caminhos = listar_imagens(args.diretorio, args.recursivo)
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    inicio = time.perf_counter()
+    total = com_chave = 0
+    try:
+        for registro in processar_diretorio(caminhos, args.workers):
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            total += 1
+            com_chave += bool(registro["chaves"])
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+    duracao = time.perf_counter() - inicio
+    print(f"{total} imagens ({com_chave} com chave) em {duracao:.1f}s: "
+          f"{total / duracao if duracao else 0:.1f} imagens/s com {args.workers} workers.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Métricas leves do pipeline: contadores e histogramas em memória, expostos no formato texto
+do Prometheus (endpoint HTTP) ou como snapshot JSON gravado periodicamente.
+
+Uso:
+    from metricas import contar, cronometrar
+    with cronometrar("fiscalis_pagina_carregamento_segundos"):
+        driver.get(url)
+    contar("fiscalis_supabase_falhas_total", tabela="itens_nota")
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Limites (em segundos) dos histogramas: de 1 ms a 1 min
+LIMITES_PADRAO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ============================================================
+# REGISTRO DAS SÉRIES
+# ============================================================
+class _Histograma:
+    __slots__ = ("baldes", "soma", "contagem")
+
+    def __init__(self, limites):
+        self.baldes = [0] * (len(limites) + 1)  # o último é o '+Inf'
+        self.soma = 0.0
+        self.contagem = 0
+
+class Registro:
+    """Guarda as séries por (nome, rótulos). Todas as operações são thread-safe."""
+
+    def __init__(self, limites=LIMITES_PADRAO):
+        self.limites = tuple(limites)
+        self._contadores = {}
+        self._histogramas = {}
+        self._trava = threading.Lock()
+
+    def contar(self, nome, valor=1, **rotulos):
+        serie = (nome, tuple(sorted(rotulos.items())))
+        with self._trava:
+            self._contadores[serie] = self._contadores.get(serie, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        serie = (nome, tuple(sorted(rotulos.items())))
+        balde = bisect_left(self.limites, valor)
+        with self._trava:
+            histograma = self._histogramas.get(serie)
+            if histograma is None:
+                histograma = self._histogramas[serie] = _Histograma(self.limites)
+            histograma.baldes[balde] += 1
+            histograma.soma += valor
+            histograma.contagem += 1
+
+    @contextmanager
+    def cronometrar(self, nome, **rotulos):
+        """Observa a duração do bloco em 'nome' (também quando o bloco lança exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def limpar(self):
+        with self._trava:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    # ---------- exposição ----------
+    def snapshot(self):
+        """Dicionário serializável com o estado atual de todas as séries."""
+        with self._trava:
+            contadores = [{"nome": n, "rotulos": dict(r), "valor": v} for (n, r), v in self._contadores.items()]
+            histogramas = [
+                {"nome": n, "rotulos": dict(r), "contagem": h.contagem, "soma": h.soma,
+                 "baldes": dict(zip([*map(str, self.limites), "+Inf"], h.baldes))}
+                for (n, r), h in self._histogramas.items()
+            ]
+        return {"instante": time.time(), "contadores": contadores, "histogramas": histogramas}
+
+    def texto_prometheus(self):
+        """Séries no formato de exposição em texto do Prometheus."""
+        def rotulos(pares, extra=()):
+            pares = list(pares) + list(extra)
+            if not pares:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+        linhas = []
+        with self._trava:
+            for nome in sorted({n for n, _ in self._contadores}):
+                linhas.append(f"# TYPE {nome} counter")
+                linhas.extend(f"{nome}{rotulos(r)} {v}" for (n, r), v in self._contadores.items() if n == nome)
+            for nome in sorted({n for n, _ in self._histogramas}):
+                linhas.append(f"# TYPE {nome} histogram")
+                for (n, r), h in self._histogramas.items():
+                    if n != nome:
+                        continue
+                    acumulado = 0
+                    for limite, quantidade in zip([*map(str, self.limites), "+Inf"], h.baldes):
+                        acumulado += quantidade
+                        linhas.append(f"{nome}_bucket{rotulos(r, [('le', limite)])} {acumulado}")
+                    linhas.append(f"{nome}_sum{rotulos(r)} {h.soma}")
+                    linhas.append(f"{nome}_count{rotulos(r)} {h.contagem}")
+        return "\n".join(linhas) + "\n"
+
+# Registro padrão do processo e atalhos
+REGISTRO = Registro()
+contar = REGISTRO.contar
+observar = REGISTRO.observar
+cronometrar = REGISTRO.cronometrar
+
+# ============================================================
+# ENDPOINT HTTP (/metrics) E SNAPSHOT PERIÓDICO
+# ============================================================
+def iniciar_servidor(porta, registro=REGISTRO, endereco="127.0.0.1"):
+    """
+    Serve 'registro' em http://endereco:porta/metrics numa thread daemon. Retorna o servidor.
+    Por padrão só aceita conexões locais; use endereco="0.0.0.0" para expor na rede.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = registro.texto_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((endereco, porta), Manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def gravar_snapshot(caminho, registro=REGISTRO):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(registro.snapshot(), arquivo)
+    os.replace(temporario, caminho)
+
+class SnapshotPeriodico:
+    """Grava o snapshot JSON em 'caminho' a cada 'intervalo' segundos e uma última vez em parar()."""
+
+    def __init__(self, caminho, intervalo=15.0, registro=REGISTRO):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.registro = registro
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self._gravar()
+
+    def _gravar(self):
+        try:
+            gravar_snapshot(self.caminho, self.registro)
+        except OSError as e:
+            logging.error(f"Erro ao gravar o snapshot de métricas em {self.caminho}: {e}")
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        self._gravar()
@@ -0,0 +1,111 @@
+"""
+Normalização dos campos raspados da NFC-e (números e datas no formato brasileiro).
+
+O objetivo é a correção, não a velocidade: milhares no formato '1.234,56' e rejeição por
+campo em vez de abortar a nota. O custo é equivalente ao da conversão antiga campo a campo
+(0,9-1,1x em benchmarks/normalizacao.py). Por isso a conversão é um laço em Python sobre os
+padrões compilados: operações de coluna (pyarrow.compute, pandas .str) mediram de 3 a 10x
+mais lentas para esses textos, em qualquer tamanho de lote.
+Um campo que não pode ser convertido vira None e é registrado em 'rejeicoes'; a nota
+continua sendo gravada com os demais campos.
+"""
+import re
+from collections import namedtuple
+from datetime import datetime
+
+# 1.234,56 | 1234,56 | 1234.56 | 12 (sem vírgula, o ponto é decimal, como no formato antigo)
+_NUMERO = re.compile(r"(-?)(?:(\d{1,3}(?:\.\d{3})+),(\d+)|(\d+)(?:[.,](\d+))?)")
+_DIGITO = re.compile(r"\d")
+_DATA_HORA = re.compile(r"\s*(\d{2})/(\d{2})/(\d{4})\s+(\d{2}):(\d{2}):(\d{2})\s*$")
+
+Rejeicao = namedtuple("Rejeicao", "campo chave_acesso valor")
+
+# ============================================================
+# CONVERSÃO DE COLUNAS
+# ============================================================
+def converter_numeros(valores):
+    """
+    Converte uma coluna de textos ('Qtde.:1,5', 'Vl. Unit.: 1.234,56'...) em floats.
+    Retorna (numeros, indices_rejeitados); valores vazios viram None sem rejeição.
+    """
+    numeros, rejeitados = [], []
+    procurar, digito = _NUMERO.search, _DIGITO.search
+    for indice, texto in enumerate(valores):
+        if not texto:
+            numeros.append(None)
+            continue
+        # Caminho rápido: sem ponto depois do rótulo ('Qtde.:', 'Vl. Unit.:'), a vírgula é o decimal
+        corpo = texto.rpartition(":")[2]
+        if "." not in corpo:
+            try:
+                numero = float(corpo.replace(",", "."))
+                if numero - numero == 0:  # descarta 'nan' e 'inf'
+                    numeros.append(numero)
+                    continue
+            except ValueError:
+                pass
+        achado = procurar(texto)
+        # Sem número, ou com mais dígitos depois dele (ex.: '1.234.567' sem vírgula): ambíguo
+        if achado is None or digito(texto, achado.end()):
+            numeros.append(None)
+            rejeitados.append(indice)
+            continue
+        sinal, milhar, decimal_milhar, inteiro, decimal = achado.groups()
+        if milhar:
+            numeros.append(float(f"{sinal}{milhar.replace('.', '')}.{decimal_milhar}"))
+        else:
+            numeros.append(float(f"{sinal}{inteiro}.{decimal}" if decimal else f"{sinal}{inteiro}"))
+    return numeros, rejeitados
+
+def converter_datas(valores):
+    """Converte 'dd/mm/aaaa hh:mm:ss' em texto ISO. Retorna (datas, indices_rejeitados)."""
+    datas, rejeitados = [], []
+    casar = _DATA_HORA.match
+    for indice, texto in enumerate(valores):
+        if not texto:
+            datas.append(None)
+            continue
+        achado = casar(texto)
+        try:
+            dia, mes, ano, hora, minuto, segundo = map(int, achado.groups())
+            datas.append(datetime(ano, mes, dia, hora, minuto, segundo).isoformat())
+        except (AttributeError, ValueError):
+            datas.append(None)
+            rejeitados.append(indice)
+    return datas, rejeitados
+
+# ============================================================
+# NORMALIZAÇÃO DE UM LOTE DE NOTAS
+# ============================================================
+def normalizar_lote(notas):
+    """
+    Recebe [(dados, chave_acesso), ...] como produzidos pela extração e devolve
+    (detalhes, itens, rejeicoes) prontos para 'notas_detalhes' e 'itens_nota'.
+    Os dicionários de 'dados' não são alterados.
+    """
+    rejeicoes = []
+
+    def coluna(conversor, campo, valores, chaves):
+        convertidos, rejeitados = conversor(valores)
+        rejeicoes.extend(Rejeicao(campo, chaves[i], valores[i]) for i in rejeitados)
+        return convertidos
+
+    chaves_notas = [chave for _, chave in notas]
+    totais = coluna(converter_numeros, "total_venda", [d["total_venda"] for d, _ in notas], chaves_notas)
+    datas = coluna(converter_datas, "data_hora_venda", [d["data_hora_venda"] for d, _ in notas], chaves_notas)
+    detalhes = [
+        {"chave_acesso": chave, "data_hora_venda": data, "forma_pagamento": dados["forma_pagamento"], "total_venda": total}
+        for (dados, chave), data, total in zip(notas, datas, totais)
+    ]
+
+    produtos = [(produto, chave) for dados, chave in notas for produto in dados["produtos"]]
+    chaves_itens = [chave for _, chave in produtos]
+    quantidades = coluna(converter_numeros, "quantidade", [p["quantidade"] for p, _ in produtos], chaves_itens)
+    precos = coluna(converter_numeros, "preco_unitario", [p["preco_unitario"] for p, _ in produtos], chaves_itens)
+    valores = coluna(converter_numeros, "valor_total", [p["valor_total"] for p, _ in produtos], chaves_itens)
+    itens = [
+        {"chave_acesso": chave, "produto": produto["produto"], "quantidade": quantidade,
+         "preco_unitario": preco, "total_item": valor}
+        for (produto, chave), quantidade, preco, valor in zip(produtos, quantidades, precos, valores)
+    ]
+    return detalhes, itens, rejeicoes
@@ -0,0 +1,54 @@
+import logging
+from metricas import cronometrar
+
+LIMITE_RESPOSTA = 1000  # linhas por resposta do PostgREST (max-rows padrão do Supabase)
+
+# ===============================================
+# PAGINAÇÃO POR CHAVE (keyset) SOBRE TABELAS DO SUPABASE
+# ===============================================
+def buscar_pagina(cliente, tabela, colunas, coluna_chave="chave_acesso", tamanho_pagina=1000, apos=None, filtros=None):
+    """
+    Busca uma página ordenada por 'coluna_chave', começando após o valor 'apos'.
+    'filtros' é uma função opcional que recebe e devolve a consulta (ex.: lambda q: q.gte(...)).
+    """
+    consulta = cliente.table(tabela).select(colunas)
+    if filtros:
+        consulta = filtros(consulta)
+    if apos is not None:
+        consulta = consulta.gt(coluna_chave, apos)
+    with cronometrar("fiscalis_supabase_round_trip_segundos", tabela=tabela, operacao="select"):
+        return consulta.order(coluna_chave).limit(tamanho_pagina).execute().data
+
+def paginar(cliente, tabela, colunas, coluna_chave="chave_acesso", tamanho_pagina=1000, apos=None, filtros=None):
+    """Percorre a tabela inteira página a página; 'colunas' deve incluir 'coluna_chave'."""
+    while True:
+        pagina = buscar_pagina(cliente, tabela, colunas, coluna_chave, tamanho_pagina, apos, filtros)
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamanho_pagina:
+            return
+        apos = pagina[-1][coluna_chave]
+
+# ===============================================
+# BUSCA POR LOTE DE CHAVES (tabelas sem chave única, como 'itens_nota')
+# ===============================================
+def buscar_por_chaves(cliente, tabela, colunas, chaves, coluna_chave="chave_acesso", limite=LIMITE_RESPOSTA):
+    """
+    Gera as páginas de linhas de 'tabela' cujas 'coluna_chave' estão em 'chaves'. Sem chave
+    única não há como paginar dentro do lote, então um lote que enche a resposta (e pode ter
+    sido cortado) é dividido ao meio e buscado de novo.
+    """
+    with cronometrar("fiscalis_supabase_round_trip_segundos", tabela=tabela, operacao="select"):
+        linhas = (cliente.table(tabela).select(colunas).in_(coluna_chave, chaves)
+                  .order(coluna_chave).limit(limite).execute().data)
+    if len(linhas) < limite:
+        if linhas:
+            yield linhas
+    elif len(chaves) > 1:
+        meio = len(chaves) // 2
+        yield from buscar_por_chaves(cliente, tabela, colunas, chaves[:meio], coluna_chave, limite)
+        yield from buscar_por_chaves(cliente, tabela, colunas, chaves[meio:], coluna_chave, limite)
+    else:
+        logging.warning(f"{coluna_chave}={chaves[0]} tem {limite} ou mais linhas em '{tabela}'; lidas só as primeiras {limite}.")
+        yield linhas
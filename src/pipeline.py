@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from extracao_qr import extrair_dados
+from extracao_nfce import consultar_nfce_http
+from gravacao_lote import GravadorLote, montar_registros
+from metricas import observar
+
+_FIM = object()
+
+# ===============================================
+# PIPELINE DE INGESTÃO (QR -> consulta -> normalização -> gravação)
+# ===============================================
+class PipelineIngestao:
+    """
+    Liga a leitura do QR Code à gravação em 'notas_detalhes' sem passar por execuções em lote.
+    Cada estágio tem seu próprio limite de concorrência e as filas entre eles são limitadas,
+    então um estágio lento segura os anteriores (backpressure) em vez de acumular memória.
+
+    'cliente' é o cliente Supabase (ou um substituto com a mesma interface) e 'consultar'
+    é a função url -> dados usada na consulta; por padrão o caminho HTTP + lxml.
+
+    Uma chave é ignorada enquanto está em andamento e depois de gravada (as últimas
+    'max_vistas' gravadas). Se a consulta, a normalização ou a gravação falhar, a chave é
+    liberada e uma nova leitura do mesmo QR tenta de novo.
+    """
+
+    def __init__(self, cliente, consultar=consultar_nfce_http, tamanho_filas=100,
+                 workers_consulta=8, workers_normalizacao=2, tamanho_lote=20, intervalo_lote=1.0,
+                 max_vistas=100_000):
+        self.consultar = consultar
+        self.tamanho_filas = tamanho_filas
+        self.max_vistas = max_vistas
+        self.gravador = GravadorLote(cliente, tamanho_lote, intervalo_lote,
+                                     ao_gravar=self._contar_gravadas, ao_falhar=self._liberar_falhas)
+        self.estatisticas = Counter()
+        self._estagios = [
+            ("extracao", self._extrair, 1),
+            ("consulta", self._consultar, workers_consulta),
+            ("normalizacao", self._normalizar, workers_normalizacao),
+            ("gravacao", self._gravar, 1),
+        ]
+        self._vistas = OrderedDict()  # chaves gravadas (LRU limitado a 'max_vistas')
+        self._em_andamento = set()
+        self._trava_chaves = threading.Lock()
+        self._loop = None
+        self._entrada = None
+        self._thread = None
+
+    # ---------- estágios ----------
+    async def _extrair(self, texto_qr):
+        dados = extrair_dados(texto_qr)
+        chave = dados["chave_acesso"]
+        with self._trava_chaves:
+            if not chave or chave in self._vistas or chave in self._em_andamento:
+                self.estatisticas["ignoradas"] += 1
+                return None
+            self._em_andamento.add(chave)
+        return chave, dados["url_cupom"]
+
+    async def _consultar(self, item):
+        chave, url = item
+        try:
+            dados = await asyncio.to_thread(self.consultar, url)
+        except Exception:
+            self._liberar(chave)
+            raise
+        return chave, dados
+
+    async def _normalizar(self, item):
+        chave, dados = item
+        try:
+            return montar_registros(dados, chave)
+        except Exception:
+            self._liberar(chave)
+            raise
+
+    async def _gravar(self, registros):
+        # adicionar() bloqueia enquanto um lote cheio é gravado: é o que segura os estágios anteriores
+        try:
+            await asyncio.to_thread(self.gravador.adicionar, *registros)
+        except Exception:
+            self._liberar(registros[0]["chave_acesso"])
+            raise
+        return None
+
+    def _liberar(self, chave):
+        with self._trava_chaves:
+            self._em_andamento.discard(chave)
+
+    def _contar_gravadas(self, chaves):
+        with self._trava_chaves:
+            for chave in chaves:
+                self._em_andamento.discard(chave)
+                self._vistas[chave] = None
+                self._vistas.move_to_end(chave)
+            while len(self._vistas) > self.max_vistas:
+                self._vistas.popitem(last=False)
+        self.estatisticas["gravadas"] += len(chaves)
+
+    def _liberar_falhas(self, chaves, erro):
+        with self._trava_chaves:
+            self._em_andamento.difference_update(chaves)
+        self.estatisticas["falhas_gravacao_lote"] += len(chaves)
+
+    # ---------- execução ----------
+    async def _rodar_estagio(self, indice, filas):
+        nome, funcao, workers = self._estagios[indice]
+        entrada = filas[indice]
+        saida = filas[indice + 1] if indice + 1 < len(filas) else None
+
+        async def worker():
+            while True:
+                item = await entrada.get()
+                if item is _FIM:
+                    return
+                inicio = time.perf_counter()
+                try:
+                    resultado = await funcao(item)
+                except Exception as e:
+                    logging.error(f"Erro no estágio '{nome}': {e}")
+                    self.estatisticas[f"falhas_{nome}"] += 1
+                    continue
+                self.estatisticas[nome] += 1
+                observar("fiscalis_pipeline_estagio_segundos", time.perf_counter() - inicio, estagio=nome)
+                if resultado is not None and saida is not None:
+                    await saida.put(resultado)
+
+        await asyncio.gather(*[worker() for _ in range(workers)])
+        # Avisa o próximo estágio que não virá mais nada
+        if saida is not None:
+            for _ in range(self._estagios[indice + 1][2]):
+                await saida.put(_FIM)
+
+    async def executar(self, fonte):
+        """Processa todos os textos de QR de 'fonte' (iterável síncrono ou assíncrono)."""
+        filas = [asyncio.Queue(maxsize=self.tamanho_filas) for _ in self._estagios]
+        tarefas = [asyncio.create_task(self._rodar_estagio(i, filas)) for i in range(len(self._estagios))]
+
+        if hasattr(fonte, "__aiter__"):
+            async for texto in fonte:
+                await filas[0].put(texto)
+        else:
+            for texto in fonte:
+                await filas[0].put(texto)
+        for _ in range(self._estagios[0][2]):
+            await filas[0].put(_FIM)
+
+        await asyncio.gather(*tarefas)
+        await asyncio.to_thread(self.gravador.fechar)
+        return dict(self.estatisticas)
+
+    # ---------- uso contínuo (ex.: leitor da fase 1) ----------
+    async def _fonte_continua(self):
+        while True:
+            texto = await self._entrada.get()
+            if texto is _FIM:
+                return
+            yield texto
+
+    def iniciar_em_segundo_plano(self):
+        """Roda o pipeline numa thread própria, recebendo textos por enviar()."""
+        pronto = threading.Event()
+
+        def rodar():
+            self._loop = asyncio.new_event_loop()
+            self._entrada = asyncio.Queue(maxsize=self.tamanho_filas)
+            pronto.set()
+            self._loop.run_until_complete(self.executar(self._fonte_continua()))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=rodar, daemon=True)
+        self._thread.start()
+        pronto.wait()
+        return self
+
+    def enviar(self, texto_qr, timeout=10):
+        """Entrega um texto de QR recém-lido ao pipeline em segundo plano."""
+        asyncio.run_coroutine_threadsafe(self._entrada.put(texto_qr), self._loop).result(timeout)
+
+    def parar(self):
+        """Drena o que já foi enviado e encerra a thread do pipeline."""
+        asyncio.run_coroutine_threadsafe(self._entrada.put(_FIM), self._loop).result()
+        self._thread.join()
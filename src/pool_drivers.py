@@ -0,0 +1,122 @@
+import logging
+import threading
+from functools import lru_cache
+from metricas import contar, cronometrar
+
+# ===============================================
+# CAMINHO DO CHROMEDRIVER (resolvido uma vez por processo)
+# ===============================================
+@lru_cache(maxsize=None)
+def caminho_chromedriver():
+    """Resolve (e baixa, se preciso) o binário do chromedriver uma única vez."""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+# ===============================================
+# INICIAR DRIVER
+# ===============================================
+def iniciar_driver():
+    # Selenium só é importado quando um driver é de fato necessário
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--start-maximized")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--allow-insecure-localhost")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    with cronometrar("fiscalis_driver_inicio_segundos"):
+        driver = webdriver.Chrome(service=Service(caminho_chromedriver()), options=options)
+    contar("fiscalis_drivers_iniciados_total")
+    return driver
+
+# ===============================================
+# DRIVER RECICLÁVEL (um por worker)
+# ===============================================
+class DriverReciclavel:
+    """Mantém um driver Chrome vivo e o recria após K páginas ou após uma falha."""
+
+    def __init__(self, paginas_por_driver=50):
+        self.paginas_por_driver = paginas_por_driver
+        self._driver = None
+        self._paginas = 0
+
+    def obter(self):
+        """Retorna o driver atual, iniciando um novo se necessário."""
+        if self._driver is None:
+            self._driver = iniciar_driver()
+            self._paginas = 0
+        return self._driver
+
+    def pagina_concluida(self):
+        """Conta uma página processada e recicla o driver ao atingir o limite."""
+        self._paginas += 1
+        if self._paginas >= self.paginas_por_driver:
+            self.encerrar()
+
+    def encerrar(self):
+        """Fecha o driver atual (se houver); o próximo obter() cria outro."""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logging.error(f"Erro ao encerrar o driver: {e}")
+            self._driver = None
+
+# ===============================================
+# POOL DE DRIVERS
+# ===============================================
+_FIM = object()
+
+class PoolDrivers:
+    """Pool de N drivers de longa duração que consomem uma fila de itens em paralelo."""
+
+    def __init__(self, num_drivers=4, paginas_por_driver=50):
+        self.num_drivers = max(1, num_drivers)
+        self.paginas_por_driver = paginas_por_driver
+
+    def processar(self, itens, tarefa):
+        """
+        Executa tarefa(item, driver_reciclavel) para cada item usando os N workers.
+        'itens' é consumido sob demanda, então pode ser um gerador (ex.: a fila de jobs).
+        Retorna quantos itens foram processados.
+        """
+        iterador = iter(itens)
+        trava_iterador = threading.Lock()
+
+        def proximo():
+            with trava_iterador:
+                return next(iterador, _FIM)
+
+        processados = [0]
+        trava = threading.Lock()
+
+        def worker():
+            reciclavel = DriverReciclavel(self.paginas_por_driver)
+            try:
+                while True:
+                    item = proximo()
+                    if item is _FIM:
+                        return
+                    try:
+                        tarefa(item, reciclavel)
+                    except Exception as e:
+                        # Driver possivelmente travado: descarta e segue com o próximo item
+                        logging.error(f"Erro no worker ao processar {item}: {e}")
+                        reciclavel.encerrar()
+                    with trava:
+                        processados[0] += 1
+            finally:
+                reciclavel.encerrar()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.num_drivers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return processados[0]
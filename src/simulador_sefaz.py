@@ -0,0 +1,139 @@
+import os
+import random
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from extracao_qr import PADRAO_CHAVE
+
+# Páginas gravadas do portal da SEFAZ (consulta + documento do iframe)
+DIRETORIO_AMOSTRAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "amostras")
+
+class _HandlerSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+# ===============================================
+# PÁGINAS SINTÉTICAS (mesma estrutura das amostras, itens configuráveis)
+# ===============================================
+PRODUTOS_SINTETICOS = ["ARROZ TIPO 1 5KG", "FEIJAO CARIOCA 1KG", "LEITE INTEGRAL 1L", "CAFE TORRADO 500G",
+                       "ACUCAR CRISTAL 1KG", "BANANA PRATA KG", "PAO FRANCES KG", "OLEO DE SOJA 900ML",
+                       "SABAO EM PO 1KG", "MACARRAO ESPAGUETE 500G", "TOMATE KG", "DETERGENTE 500ML"]
+FORMAS_SINTETICAS = ["Cartão de Crédito", "Cartão de Débito", "Dinheiro", "Vale Alimentação"]
+
+def _moeda(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def gerar_consulta(parametro_p, itens=None):
+    """Página de consulta com o iframe apontando para o documento sintético."""
+    sufixo = f"&amp;itens={itens}" if itens else ""
+    return (
+        '<!DOCTYPE html>\n<html lang="pt-br">\n<head><meta charset="utf-8"><title>Consulta NFC-e</title></head>\n'
+        f'<body><div id="Conteudo"><iframe id="iframeConteudo" src="danfeNFCe?p={parametro_p}{sufixo}"></iframe></div></body>\n</html>\n'
+    )
+
+def gerar_danfe(chave, itens=5):
+    """Documento DANFE determinístico para a chave: mesmos itens e valores a cada chamada."""
+    aleatorio = random.Random(chave)
+    linhas, total = [], 0.0
+    for numero in range(1, itens + 1):
+        produto = aleatorio.choice(PRODUTOS_SINTETICOS)
+        quantidade = aleatorio.choice([1, 1, 2, 3, 0.5, 1.235])
+        preco = round(aleatorio.uniform(1.5, 60.0), 2)
+        valor = round(quantidade * preco, 2)
+        total += valor
+        qtde = f"{quantidade:g}".replace(".", ",")
+        linhas.append(
+            f'<tr id="Item + {numero}"><td valign="top"><span class="txtTit">{produto}</span>'
+            f'<span class="RCod">(Código: {7890000000000 + numero} )</span><br>'
+            f'<span class="Rqtd"><strong>Qtde.:</strong>{qtde}</span><span class="RUN"><strong>UN: </strong>UN</span>'
+            f'<span class="RvlUnit"><strong>Vl. Unit.:</strong>&nbsp;{_moeda(preco)}</span></td>'
+            f'<td align="right" valign="top" class="txtTit noWrap">Vl. Total<br><span class="valor">{_moeda(valor)}</span></td></tr>'
+        )
+    emissao = f"{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/2024 " \
+              f"{aleatorio.randint(7, 21):02d}:{aleatorio.randint(0, 59):02d}:{aleatorio.randint(0, 59):02d}"
+    forma = aleatorio.choice(FORMAS_SINTETICAS)
+    return (
+        '<!DOCTYPE html>\n<html lang="pt-br">\n<head><meta charset="utf-8"><title>DANFE NFC-e</title></head>\n<body>\n'
+        '<div id="conteudo"><div id="avisos"></div><div id="cabecalho"></div><div id="conteudoTopo"></div>'
+        '<div data-role="page"><div data-role="content"><div class="ui-bar"><h4>DANFE NFC-e</h4></div>'
+        '<div class="ui-grid-a"><div id="corpoNota">'
+        '<div class="txtCenter"><div class="txtTopo">SUPERMERCADO SINTETICO LTDA</div></div>'
+        '<div class="txtCenter"><div class="text">RUA SIMULADA, 1, CENTRO, SAO PAULO, SP</div></div>'
+        f'<table id="tabResult"><tbody>{"".join(linhas)}</tbody></table>'
+        '<div id="totalNota" class="txtRight">'
+        f'<div id="linhaTotal"><label>Qtd. total de itens:</label><span class="totalNumb">{itens}</span></div>'
+        f'<div id="linhaTotal" class="linhaShade"><label>Valor a pagar R$:</label><span class="totalNumb txtMax">{_moeda(total)}</span></div>'
+        '<div id="linhaForma"><label>Forma de pagamento:</label><span class="totalNumb txtTitR">Valor pago R$:</span></div>'
+        f'<div id="linhaTotal"><label class="tx">{forma}</label><span class="totalNumb">{_moeda(total)}</span></div>'
+        '</div></div>'
+        '<div id="infos" class="ui-collapsible-set"><div data-role="collapsible"><h4>Informações gerais da Nota</h4>'
+        '<div class="ui-collapsible-content"><ul data-role="listview">'
+        f'<li><strong>Modelo: </strong>65 <strong>Emissão: </strong>{emissao} - Via Consumidor</li>'
+        '</ul></div></div></div></div></div></div></div>\n</body>\n</html>\n'
+    )
+
+def url_sintetica(url_base, chave, itens=None):
+    """URL de consulta (como a do QR Code) de uma nota sintética com 'itens' itens."""
+    sufixo = f"&itens={itens}" if itens else ""
+    return f"{url_base}/sintetica/consulta?p={chave}|2|1|1|{'0' * 40}{sufixo}"
+
+class _HandlerSimulador(_HandlerSilencioso):
+    """Serve as amostras do diretório e as páginas sintéticas em /sintetica/."""
+
+    def __init__(self, *args, latencia=0.0, itens_padrao=5, **kwargs):
+        self.latencia = latencia
+        self.itens_padrao = itens_padrao
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        caminho, _, consulta = self.path.partition("?")
+        if caminho not in ("/sintetica/consulta", "/sintetica/danfeNFCe"):
+            return super().do_GET()
+
+        if self.latencia:
+            time.sleep(self.latencia)
+        parametros = parse_qs(consulta)
+        parametro_p = parametros.get("p", [""])[0]
+        encontrada = PADRAO_CHAVE.search(parametro_p)
+        if not encontrada:
+            self.send_error(404)
+            return
+        itens = int(parametros.get("itens", [self.itens_padrao])[0])
+        if caminho == "/sintetica/consulta":
+            corpo = gerar_consulta(parametro_p, parametros.get("itens", [None])[0])
+        else:
+            corpo = gerar_danfe(encontrada.group(0), itens)
+
+        dados = corpo.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+# ===============================================
+# SERVIDOR LOCAL QUE SUBSTITUI O PORTAL DA SEFAZ
+# ===============================================
+def iniciar_simulador(porta=0, diretorio=DIRETORIO_AMOSTRAS, latencia=0.0, itens_padrao=5):
+    """
+    Sobe um servidor HTTP local com as páginas de amostra em segundo plano.
+    'latencia' (segundos) atrasa cada resposta sintética; 'itens_padrao' é o número de itens
+    das notas sintéticas quando a URL não traz '&itens='.
+    Retorna (servidor, url_base); use servidor.shutdown() para encerrar.
+    """
+    handler = partial(_HandlerSimulador, directory=diretorio, latencia=latencia, itens_padrao=itens_padrao)
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}"
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    servidor, url_base = iniciar_simulador(porta)
+    print(f"Simulador SEFAZ em {url_base}/consulta_nfce.html (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
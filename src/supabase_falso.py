@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+
+# Colunas usadas como chave primária nos upserts (itens_nota não tem chave única)
+CHAVES_PRIMARIAS = {
+    "notas_fiscais": "chave_acesso",
+    "notas_detalhes": "chave_acesso",
+}
+
+class RespostaFalsa:
+    def __init__(self, data):
+        self.data = data
+
+# ===============================================
+# CONSULTA ENCADEADA (mesma interface do cliente supabase-py)
+# ===============================================
+class _ConsultaFalsa:
+    def __init__(self, cliente, tabela):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._operacao = "select"
+        self._colunas = None
+        self._linhas = None
+        self._filtros = []
+        self._ordem = None
+        self._limite = None
+        self._inicio = 0
+
+    def select(self, colunas="*"):
+        self._colunas = None if colunas.strip() == "*" else [c.strip() for c in colunas.split(",")]
+        return self
+
+    def insert(self, linhas):
+        self._operacao = "insert"
+        self._linhas = linhas if isinstance(linhas, list) else [linhas]
+        return self
+
+    def upsert(self, linhas, on_conflict=None):
+        self._operacao = "upsert"
+        self._linhas = linhas if isinstance(linhas, list) else [linhas]
+        return self
+
+    def delete(self):
+        self._operacao = "delete"
+        return self
+
+    def eq(self, coluna, valor):
+        self._filtros.append(lambda l: l.get(coluna) == valor)
+        return self
+
+    def gt(self, coluna, valor):
+        self._filtros.append(lambda l: l.get(coluna) is not None and l[coluna] > valor)
+        return self
+
+    def gte(self, coluna, valor):
+        self._filtros.append(lambda l: l.get(coluna) is not None and l[coluna] >= valor)
+        return self
+
+    def lte(self, coluna, valor):
+        self._filtros.append(lambda l: l.get(coluna) is not None and l[coluna] <= valor)
+        return self
+
+    def in_(self, coluna, valores):
+        valores = set(valores)
+        self._filtros.append(lambda l: l.get(coluna) in valores)
+        return self
+
+    def order(self, coluna, desc=False):
+        self._ordem = (coluna, desc)
+        return self
+
+    def limit(self, quantidade):
+        self._limite = quantidade
+        return self
+
+    def range(self, inicio, fim):
+        self._inicio = inicio
+        self._limite = fim - inicio + 1
+        return self
+
+    def execute(self):
+        return self._cliente._executar(self)
+
+# ===============================================
+# CLIENTE FALSO EM MEMÓRIA
+# ===============================================
+class ClienteFalso:
+    """
+    Substituto em processo do cliente Supabase (table(...).select/eq/insert/upsert...).
+    'latencia' simula o tempo de ida e volta de cada chamada; 'round_trips' conta as chamadas.
+    """
+
+    def __init__(self, tabelas=None, latencia=0.0):
+        self.tabelas = {nome: list(linhas) for nome, linhas in (tabelas or {}).items()}
+        self.latencia = latencia
+        self.round_trips = 0
+        self._trava = threading.Lock()
+
+    def table(self, nome):
+        return _ConsultaFalsa(self, nome)
+
+    def _executar(self, consulta):
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._trava:
+            self.round_trips += 1
+            linhas = self.tabelas.setdefault(consulta._tabela, [])
+
+            if consulta._operacao == "insert":
+                novas = copy.deepcopy(consulta._linhas)
+                linhas.extend(novas)
+                return RespostaFalsa(novas)
+
+            if consulta._operacao == "upsert":
+                novas = copy.deepcopy(consulta._linhas)
+                chave = CHAVES_PRIMARIAS.get(consulta._tabela)
+                if chave:
+                    posicoes = {l.get(chave): i for i, l in enumerate(linhas)}
+                    for nova in novas:
+                        if nova.get(chave) in posicoes:
+                            linhas[posicoes[nova[chave]]].update(nova)
+                        else:
+                            posicoes[nova.get(chave)] = len(linhas)
+                            linhas.append(nova)
+                else:
+                    linhas.extend(novas)
+                return RespostaFalsa(novas)
+
+            if consulta._operacao == "delete":
+                removidas = [l for l in linhas if all(f(l) for f in consulta._filtros)]
+                linhas[:] = [l for l in linhas if not all(f(l) for f in consulta._filtros)]
+                return RespostaFalsa(removidas)
+
+            resultado = [l for l in linhas if all(f(l) for f in consulta._filtros)]
+            if consulta._ordem:
+                coluna, desc = consulta._ordem
+                resultado.sort(key=lambda l: (l.get(coluna) is None, l.get(coluna)), reverse=desc)
+            fim = None if consulta._limite is None else consulta._inicio + consulta._limite
+            resultado = resultado[consulta._inicio:fim]
+            if consulta._colunas:
+                resultado = [{c: l.get(c) for c in consulta._colunas} for l in resultado]
+            return RespostaFalsa(copy.deepcopy(resultado))
@@ -1,105 +1,80 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from supabase import create_client
 from datetime import datetime
-import configparser
+from cliente import obter_config, obter_supabase
+
+# Configuração e cliente do Supabase são carregados no primeiro uso (ver cliente.py);
+# pandas e matplotlib só são importados quando há dados para agregar e desenhar
+config = obter_config()
+
+# Fonte das análises: 'supabase' (padrão) ou 'espelho' (Parquet local, ver espelho_local.py)
+FONTE_ANALISE = config.get('ANALISE', 'FONTE', fallback='supabase')
+DIRETORIO_ESPELHO = config.get('ANALISE', 'DIRETORIO_ESPELHO', fallback='espelho')
+# Gráficos de vendas: 'imagem' (PNG do Matplotlib em cache, ver graficos.py) ou 'nativo' (st.bar_chart)
+GRAFICOS = config.get('ANALISE', 'GRAFICOS', fallback='imagem')
+
+# Função para obter as séries agregadas (no banco, ou localmente como alternativa)
+def obter_series_vendas(data_inicio, data_fim, forma_pagamento):
+    if FONTE_ANALISE == "espelho":
+        from agregacao import agregar_no_espelho
+        from espelho_local import conectar
+        return agregar_no_espelho(conectar(DIRETORIO_ESPELHO), data_inicio, data_fim, forma_pagamento)
+    from agregacao import agregar_vendas
+    return agregar_vendas(obter_supabase(), data_inicio, data_fim, forma_pagamento)
+
+# Itens do espelho já indexados por produto (carregados uma vez por sessão do servidor)
+@st.cache_resource(ttl=600)
+def obter_itens_produtos():
+    from analise_produtos import carregar_itens_espelho
+    return carregar_itens_espelho(DIRETORIO_ESPELHO)
 
-# Crie um objeto ConfigParser
-config = configparser.ConfigParser()
-
-# Leia o arquivo de configuração
-config.read('config.ini')
-
-# Verifique se a seção 'SUPABASE' existe
-if 'SUPABASE' in config:
-    SUPABASE_URL = config['SUPABASE']['SUPABASE_URL']
-    SUPABASE_KEY = config['SUPABASE']['SUPABASE_KEY']
-else:
-    print("Erro: Seção 'SUPABASE' não encontrada no arquivo de configuração.")
-    exit(1)  # Encerra o programa se não encontrar a seção
-
-# Cria o cliente do Supabase com as variáveis carregadas
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Função para calcular e exibir métricas
+def calcular_metricas(series):
+    resumo = series["resumo"]
+    return resumo["total"], resumo["quantidade"], resumo["media"]
 
-# Função para obter os dados filtrados do Supabase
-def obter_dados_vendas(data_inicio, data_fim, forma_pagamento):
-    # Alterado para consultar a tabela "notas_detalhes" para pegar a "data_hora_venda"
-    query = supabase.table("notas_detalhes").select("*").gte("data_hora_venda", data_inicio).lte("data_hora_venda", data_fim)
+# Função para gerar os gráficos
+def gerar_graficos(series):
+    from graficos import renderizar_png, series_nativas
+
+    if GRAFICOS == "nativo":
+        # Gráficos nativos do Streamlit: os totais vão direto para o navegador, sem Matplotlib
+        for titulo, total in series_nativas(series):
+            st.write(titulo)
+            st.bar_chart(total)
+    else:
+        # Uma figura com os quatro gráficos, reaproveitada enquanto as séries não mudarem
+        st.image(renderizar_png(series))
 
-    if forma_pagamento != "Todas":
-        query = query.eq("forma_pagamento", forma_pagamento)
+# Seção de produtos (lê 'itens_nota'; disponível com a fonte 'espelho')
+def exibir_analise_produtos():
+    from analise_produtos import top_produtos_por_gasto, serie_precos, distribuicao_tamanho_cesta, indice_inflacao
 
-    return query.execute().data
+    st.subheader("Produtos")
+    if FONTE_ANALISE != "espelho":
+        st.info("A análise de produtos usa o espelho local. Configure FONTE = espelho na seção [ANALISE].")
+        return
 
-# Função para calcular e exibir métricas
-def calcular_metricas(dados):
-    total_vendas = sum([item['total_venda'] for item in dados])
-    num_transacoes = len(dados)
-    valor_medio_venda = total_vendas / num_transacoes if num_transacoes > 0 else 0
-    return total_vendas, num_transacoes, valor_medio_venda
+    itens = obter_itens_produtos()
+    if not len(itens):
+        st.warning("Nenhum item encontrado no espelho.")
+        return
 
-# Função para gerar os gráficos
-def gerar_graficos(dados):
-    # Convertendo os dados para DataFrame
-    df = pd.DataFrame(dados)
+    top = top_produtos_por_gasto(itens, n=10)
+    st.write("Produtos com maior gasto")
+    st.dataframe(top)
 
-    # Verificando se a coluna 'forma_pagamento' existe
-    if 'forma_pagamento' not in df.columns:
-        st.error("A coluna 'forma_pagamento' não foi encontrada nos dados.")
-        return
+    produto = st.selectbox("Preço ao longo do tempo", top["produto"])
+    precos = serie_precos(itens, produto)
+    precos.index = precos.index.astype(str)
+    st.line_chart(precos)
 
-    # Filtrando os dados: remover linha onde 'forma_pagamento' está vazio ou igual a 'Valor a Pagar'
-    df = df[df['forma_pagamento'] != '']
-    df = df[df['forma_pagamento'] != 'Valor a Pagar']
-
-    # Substituindo 'Valor a Pagar' por 'Não Especificado'
-    df['forma_pagamento'] = df['forma_pagamento'].replace('Valor a pagar R$:', 'Não Especificado')
-
-    # Convertendo 'data_hora_venda' para datetime
-    df['data_hora_venda'] = pd.to_datetime(df['data_hora_venda'])
-
-    # Adicionando colunas de agrupamento por dia, semana e mês
-    df['dia'] = df['data_hora_venda'].dt.date
-    df['semana'] = df['data_hora_venda'].dt.isocalendar().week
-    df['mes'] = df['data_hora_venda'].dt.month
-
-    # Total de vendas por dia, semana e mês
-    vendas_diarias = df.groupby('dia')['total_venda'].sum()
-    vendas_semanal = df.groupby('semana')['total_venda'].sum()
-    vendas_mensal = df.groupby('mes')['total_venda'].sum()
-
-    # Gráfico: Total de vendas por dia
-    plt.figure(figsize=(10, 6))
-    vendas_diarias.plot(kind='bar', color='skyblue')
-    plt.title("Total de Vendas por Dia")
-    plt.ylabel("Vendas (R$)")
-    st.pyplot(plt)
-
-    # Gráfico: Total de vendas por semana
-    plt.figure(figsize=(10, 6))
-    vendas_semanal.plot(kind='bar', color='lightgreen')
-    plt.title("Total de Vendas por Semana")
-    plt.ylabel("Vendas (R$)")
-    st.pyplot(plt)
-
-    # Gráfico: Total de vendas por mês
-    plt.figure(figsize=(10, 6))
-    vendas_mensal.plot(kind='bar', color='salmon')
-    plt.title("Total de Vendas por Mês")
-    plt.ylabel("Vendas (R$)")
-    st.pyplot(plt)
-
-    # Comparativo entre formas de pagamento
-    pagamento_comparativo = df.groupby('forma_pagamento')['total_venda'].sum()
-    
-    # Gráfico: Comparativo de Vendas por Forma de Pagamento
-    plt.figure(figsize=(10, 6))
-    pagamento_comparativo.plot(kind='bar', color='purple')
-    plt.title("Comparativo de Vendas por Forma de Pagamento")
-    plt.ylabel("Vendas (R$)")
-    st.pyplot(plt)
+    st.write("Itens por nota")
+    st.bar_chart(distribuicao_tamanho_cesta(itens))
 
+    st.write("Índice de preços (base 100 no primeiro mês)")
+    indice = indice_inflacao(itens)
+    indice.index = indice.index.astype(str)
+    st.line_chart(indice)
 
 
 # Streamlit Interface
@@ -114,20 +89,22 @@ def dashboard():
     # Alterando as opções de forma de pagamento para incluir Cartão de Crédito e Cartão de Débito
     forma_pagamento = st.selectbox("Forma de Pagamento", ["Todas", "Cartão de Crédito", "Cartão de Débito", "Dinheiro", "Vale Alimentação"])
 
-    # Obtendo os dados
-    dados = obter_dados_vendas(data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'), forma_pagamento)
+    # Obtendo as séries já agregadas
+    series = obter_series_vendas(data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'), forma_pagamento)
 
-    if dados:
+    if series["resumo"]["quantidade"]:
         # Calcular e exibir métricas
-        total_vendas, num_transacoes, valor_medio_venda = calcular_metricas(dados)
+        total_vendas, num_transacoes, valor_medio_venda = calcular_metricas(series)
         st.metric("Total de Vendas (R$)", f"R$ {total_vendas:.2f}")
         st.metric("Valor Médio por Venda (R$)", f"R$ {valor_medio_venda:.2f}")
 
         # Exibir gráficos
-        gerar_graficos(dados)
+        gerar_graficos(series)
     else:
         st.warning("Nenhum dado encontrado para os filtros selecionados.")
 
+    exibir_analise_produtos()
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+"""PipelineIngestao de ponta a ponta: simulador_sefaz como portal e ClienteFalso como banco."""
+import asyncio
+import random
+import pytest
+from benchmarks.corpus_qr import gerar_chave
+from extracao_nfce import consultar_nfce_http
+from pipeline import PipelineIngestao
+from simulador_sefaz import iniciar_simulador, url_sintetica
+from supabase_falso import ClienteFalso
+
+ITENS = 3
+
+@pytest.fixture(scope="module")
+def url_base():
+    servidor, url_base = iniciar_simulador(porta=0)
+    yield url_base
+    servidor.shutdown()
+
+def chaves(quantidade, semente=3):
+    aleatorio = random.Random(semente)
+    return [gerar_chave(aleatorio) for _ in range(quantidade)]
+
+def test_grava_notas_e_itens(url_base):
+    lidas = chaves(12)
+    textos = [url_sintetica(url_base, chave, ITENS) for chave in lidas]
+    textos += textos[:2] + ["texto sem chave"]  # QR lido de novo e QR inválido
+    cliente = ClienteFalso()
+
+    estatisticas = asyncio.run(PipelineIngestao(cliente, tamanho_lote=5).executar(textos))
+
+    detalhes = cliente.tabelas["notas_detalhes"]
+    itens = cliente.tabelas["itens_nota"]
+    assert sorted(d["chave_acesso"] for d in detalhes) == sorted(lidas)
+    assert len(itens) == len(lidas) * ITENS
+    assert {i["chave_acesso"] for i in itens} == set(lidas)
+    assert all(isinstance(d["total_venda"], float) for d in detalhes)
+    assert estatisticas["gravadas"] == len(lidas)
+    assert estatisticas["consulta"] == len(lidas)
+    assert estatisticas["ignoradas"] == 3
+    assert not any(nome.startswith("falhas") for nome in estatisticas)
+
+def test_falha_na_consulta_libera_a_chave(url_base):
+    chave = chaves(1, semente=5)[0]
+    texto = url_sintetica(url_base, chave, ITENS)
+    tentativas = []
+
+    def consultar(url):
+        tentativas.append(url)
+        if len(tentativas) == 1:
+            raise ConnectionError("portal fora do ar")
+        return consultar_nfce_http(url)
+
+    cliente = ClienteFalso()
+    pipeline = PipelineIngestao(cliente, consultar=consultar)
+
+    async def fonte():
+        yield texto
+        while not pipeline.estatisticas["falhas_consulta"]:
+            await asyncio.sleep(0.01)
+        yield texto  # nova leitura do mesmo QR depois da falha
+
+    estatisticas = asyncio.run(pipeline.executar(fonte()))
+
+    assert len(tentativas) == 2
+    assert estatisticas["falhas_consulta"] == 1
+    assert estatisticas["gravadas"] == 1
+    assert [d["chave_acesso"] for d in cliente.tabelas["notas_detalhes"]] == [chave]
+
+def test_vistas_limitadas(url_base):
+    lidas = chaves(6, semente=9)
+    pipeline = PipelineIngestao(ClienteFalso(), max_vistas=4)
+    asyncio.run(pipeline.executar([url_sintetica(url_base, chave, ITENS) for chave in lidas]))
+    assert len(pipeline._vistas) == 4
@@ -0,0 +1,34 @@
+"""Extração estática contra as páginas de amostra servidas pelo simulador_sefaz."""
+import os
+import pytest
+from extracao_nfce import consultar_nfce_http, ExtracaoEstaticaFalhou
+from simulador_sefaz import iniciar_simulador
+
+DIRETORIO_AMOSTRAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "amostras")
+
+@pytest.fixture(scope="module")
+def url_base():
+    servidor, url_base = iniciar_simulador(porta=0, diretorio=DIRETORIO_AMOSTRAS)
+    yield url_base
+    servidor.shutdown()
+
+def test_consulta_estatica(url_base):
+    url = f"{url_base}/consulta_nfce.html"
+    assert consultar_nfce_http(url) == {
+        "url": url,
+        "produtos": [
+            {"produto": "ARROZ TIPO 1 5KG", "quantidade": "Qtde.:1",
+             "preco_unitario": "Vl. Unit.: 24,90", "valor_total": "24,90"},
+            {"produto": "BANANA PRATA KG", "quantidade": "Qtde.:1,235",
+             "preco_unitario": "Vl. Unit.: 6,99", "valor_total": "8,63"},
+            {"produto": "LEITE INTEGRAL 1L", "quantidade": "Qtde.:4",
+             "preco_unitario": "Vl. Unit.: 4,79", "valor_total": "19,16"},
+        ],
+        "data_hora_venda": "15/03/2024 14:22:05",
+        "total_venda": "52,69",
+        "forma_pagamento": "Cartão de Crédito",
+    }
+
+def test_consulta_dinamica_exige_navegador(url_base):
+    with pytest.raises(ExtracaoEstaticaFalhou):
+        consultar_nfce_http(f"{url_base}/consulta_nfce_dinamica.html")